@@ -4,6 +4,11 @@ import json
 
 from .classes import Savable
 
+# Fields of every action class as (json key, attribute name) pairs and the event type of every action class.
+# Both are filled in by Action.fields, once per class.
+_class_fields: dict[type, tuple[tuple[str, str], ...]] = {}
+_class_event_types: dict[type, str] = {}
+
 
 class Action(Savable):
     """Baseclass for Action object.
@@ -18,6 +23,8 @@ class Action(Savable):
         save: saves values to a json string or dict (inherited from Savable)
     """
 
+    __slots__ = ("event_type",)
+
     def __init__(self, event_type: str):
         self.event_type = event_type
 
@@ -27,6 +34,36 @@ class Action(Savable):
     def __repr__(self):
         return self.save()
 
+    @classmethod
+    def fields(cls) -> tuple[tuple[str, str], ...]:
+        """
+        Returns the fields of this action class as (json key, attribute name) pairs.
+        The fields are looked up once per class and cached afterwards.
+        """
+        fields = _class_fields.get(cls)
+        if fields is None:
+            instance = cls()
+            fields = _class_fields[cls] = tuple(
+                (attr.replace("_", ""), attr) for attr in dir(instance)
+                if not callable(getattr(instance, attr)) and not attr.startswith("__") and attr != "event_type"
+            )
+            _class_event_types[cls] = instance.event_type
+        return fields
+
+    @classmethod
+    def from_dict(cls, json_dict: dict) -> "Action":
+        """
+        Creates an action of this class from a dict without calling __init__.
+
+        :param json_dict: dict:
+        """
+        fields = cls.fields()
+        action = cls.__new__(cls)
+        action.event_type = _class_event_types[cls]
+        for key, attr in fields:
+            setattr(action, attr, json_dict.get(key))
+        return action
+
     def load(self, json_dict: str | dict):
         """
 
@@ -37,21 +74,15 @@ class Action(Savable):
         if isinstance(json_dict, str):
             json_dict = json.loads(json_dict)
 
-        class_fields = [attr for attr in dir(self)
-                        if not callable(getattr(self, attr)) and not attr.startswith("__")]
-        for attr in class_fields:
-            if attr == "event_type":
-                continue
-            try:
-                conv = attr.replace("_", "")
-                setattr(self, attr, json_dict.get(conv, None))
-            except KeyError:
-                raise TypeError("This is not the correct event class or the input is malformed!")
+        for key, attr in self.fields():
+            setattr(self, attr, json_dict.get(key))
 
 
 class AddDecoration(Action):
     """ """
 
+    __slots__ = ("decorationImage", "position", "relativeTo", "pivotOffset", "rotation", "scale", "depth", "tag")
+
     def __init__(self, decoration_image=None, position=None, relative_to=None, pivot_offset=None,
                  rotation=None, scale=None, depth=None, tag=None):
         super().__init__(event_type="AddDecoration")
@@ -68,6 +99,8 @@ class AddDecoration(Action):
 class AnimateTrack(Action):
     """ """
 
+    __slots__ = ("trackAnimation", "beatsAhead", "trackDisappearAnimation", "beatsBehind")
+
     trackAnimation: str
     beatsAhead: float
     trackDisappearAnimation: str
@@ -84,6 +117,8 @@ class AnimateTrack(Action):
 class Bloom(Action):
     """ """
 
+    __slots__ = ("enabled", "threshold", "intensity", "color", "angleOffset", "eventTag")
+
     def __init__(self, enabled=None, threshold=None, intensity=None, color=None, angle_offset=None, event_tag=None):
         super().__init__(event_type="Bloom")
         self.enabled = enabled
@@ -97,6 +132,10 @@ class Bloom(Action):
 class ChangeTrack(Action):
     """ """
 
+    __slots__ = ("trackColorType", "trackColor", "secondaryTrackColor", "trackColorAnimDuration", "trackColorPulse",
+                 "trackPulseLength", "trackStyle", "trackAnimation", "beatsAhead", "trackDisappearAnimation",
+                 "beatsBehind")
+
     def __init__(self, track_color_type=None, track_color=None, secondary_track_color=None,
                  track_color_anim_duration=None, track_color_pulse=None, track_pulse_length=None, track_style=None,
                  track_animation=None, beats_ahead=None, track_disappear_animation=None, beats_behind=None):
@@ -117,6 +156,8 @@ class ChangeTrack(Action):
 class Checkpoint(Action):
     """ """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(event_type="CheckPoint")
 
@@ -124,6 +165,9 @@ class Checkpoint(Action):
 class ColorTrack(Action):
     """ """
 
+    __slots__ = ("trackColorType", "trackColor", "secondaryTrackColor", "trackColorAnimDuration", "trackColorPulse",
+                 "trackPulseLength", "trackStyle")
+
     def __init__(self, track_color_type=None, track_color=None, secondary_track_color=None,
                  track_color_anim_duration=None,
                  track_color_pulse=None, track_pulse_length=None, track_style=None):
@@ -140,6 +184,9 @@ class ColorTrack(Action):
 class CustomBackground(Action):
     """ """
 
+    __slots__ = ("color", "bgImage", "imageColor", "parallax", "bgDisplayMode", "lockRot", "loopBg", "unscaledSize",
+                 "angleOffset", "eventTag")
+
     def __init__(self, color=None, bg_image=None, image_color=None, parallax=None, bg_display_mode=None, lock_rot=None,
                  loop_bg=None, unscaled_size=None, angle_offset=None, event_tag=None):
         super().__init__(event_type="CustomBackground")
@@ -158,6 +205,9 @@ class CustomBackground(Action):
 class Flash(Action):
     """ """
 
+    __slots__ = ("duration", "plane", "startColor", "startOpacity", "endColor", "endOpacity", "angleOffset",
+                 "eventTag")
+
     def __init__(self, duration=None, plane=None, start_color=None, start_opacity=None, end_color=None,
                  end_opacity=None, angle_offset=None, event_tag=None):
         super().__init__(event_type="Flash")
@@ -174,6 +224,8 @@ class Flash(Action):
 class HallOfMirrors(Action):
     """ """
 
+    __slots__ = ("enabled", "angleOffset", "eventTag")
+
     def __init__(self, enabled=None, angle_offset=None, event_tag=None):
         super().__init__(event_type="HallOfMirrors")
         self.enabled = enabled
@@ -184,6 +236,8 @@ class HallOfMirrors(Action):
 class MoveCamera(Action):
     """ """
 
+    __slots__ = ("duration", "relativeTo", "position", "rotation", "zoom", "angleOffset", "ease", "eventTag")
+
     def __init__(self, duration=None, relative_to=None, position=None, rotation=None, zoom=None,
                  angle_offset=None, ease=None, event_tag=None):
         super().__init__(event_type="MoveCamera")
@@ -200,6 +254,8 @@ class MoveCamera(Action):
 class MoveDecorations(Action):
     """ """
 
+    __slots__ = ("duration", "tag", "positionOffset", "rotationOffset", "scale", "angleOffset", "ease", "eventTag")
+
     def __init__(self, duration=None, tag=None, position_offset=None, rotation_offset=None, scale=None,
                  angle_offset=None, ease=None, event_tag=None):
         super().__init__(event_type="MoveDecorations")
@@ -216,6 +272,9 @@ class MoveDecorations(Action):
 class MoveTrack(Action):
     """ """
 
+    __slots__ = ("startTile", "endTile", "duration", "positionOffset", "rotation", "scale", "opacity", "angleOffset",
+                 "ease", "eventTag")
+
     def __init__(self, start_tile=None, end_tile=None, duration=None, position_offset=None, rotation=None, scale=None,
                  opacity=None, angle_offset=None, ease=None, event_tag=None):
         super().__init__(event_type="MoveTrack")
@@ -234,6 +293,8 @@ class MoveTrack(Action):
 class PositionTrack(Action):
     """ """
 
+    __slots__ = ("positionOffset", "editorOnly")
+
     def __init__(self, position_offset=None, editor_only=None):
         super().__init__(event_type="PositionTrack")
         self.positionOffset = position_offset
@@ -243,6 +304,10 @@ class PositionTrack(Action):
 class RecolorTrack(Action):
     """ """
 
+    __slots__ = ("startTile", "endTile", "trackColorType", "trackColor", "secondaryTrackColor",
+                 "trackColorAnimDuration", "trackColorPulse", "trackPulseLength", "trackStyle", "angleOffset",
+                 "eventTag")
+
     def __init__(self, start_tile=None, end_tile=None, track_color_type=None, track_color=None,
                  secondary_track_color=None, track_color_anim_duration=None, track_color_pulse=None,
                  track_pulse_length=None, track_style=None, angle_offset=None, event_tag=None):
@@ -263,6 +328,8 @@ class RecolorTrack(Action):
 class RepeatEvents(Action):
     """ """
 
+    __slots__ = ("repetitions", "interval", "tag")
+
     def __init__(self, repetitions=None, interval=None, tag=None):
         super().__init__(event_type="RepeatEvents")
         self.repetitions = repetitions
@@ -273,6 +340,8 @@ class RepeatEvents(Action):
 class SetConditionalEvents(Action):
     """ """
 
+    __slots__ = ("perfectTag", "hitTag", "barelyTag", "missTag", "lossTag")
+
     def __init__(self, perfect_tag=None, hit_tag=None, barely_tag=None, miss_tag=None, loss_tag=None):
         super().__init__(event_type="SetConditionalEvents")
         self.perfectTag = perfect_tag
@@ -285,6 +354,8 @@ class SetConditionalEvents(Action):
 class SetFilter(Action):
     """ """
 
+    __slots__ = ("_filter", "enabled", "intensity", "disableOthers", "angleOffset", "eventTag")
+
     def __init__(self, _filter=None, enabled=None, intensity=None, disable_others=None,
                  angle_offset=None, event_tag=None):
         super().__init__(event_type="SetFilter")
@@ -299,6 +370,8 @@ class SetFilter(Action):
 class SetHitsound(Action):
     """ """
 
+    __slots__ = ("hitsound", "hitsoundVolume")
+
     def __init__(self, hitsound=None, hitsound_volume=None):
         super().__init__(event_type="SetHitsound")
         self.hitsound = hitsound
@@ -308,6 +381,8 @@ class SetHitsound(Action):
 class SetPlanetRotation(Action):
     """ """
 
+    __slots__ = ("ease", "easeParts")
+
     def __init__(self, ease=None, ease_parts=None):
         super().__init__(event_type="SetPlanetRotation")
         self.ease = ease
@@ -317,6 +392,8 @@ class SetPlanetRotation(Action):
 class SetSpeed(Action):
     """ """
 
+    __slots__ = ("speedType", "beatsPerMinute", "bpmMultiplier")
+
     def __init__(self, speed_type=None, beats_per_minute=None, bpm_multiplier=None):
         super().__init__(event_type="SetSpeed")
         self.speedType = speed_type
@@ -327,6 +404,8 @@ class SetSpeed(Action):
 class ShakeScreen(Action):
     """ """
 
+    __slots__ = ("duration", "strength", "intensity", "fadeOut", "angleOffset", "eventTag")
+
     def __init__(self, duration=None, strength=None, intensity=None, fade_out=None, angle_offset=None, event_tag=None):
         super().__init__(event_type="ShakeScreen")
         self.duration = duration
@@ -340,11 +419,42 @@ class ShakeScreen(Action):
 class Twirl(Action):
     """ """
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(event_type="Twirl")
 
 
 class Bookmark(Action):
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(event_type="Bookmark")
+
+
+def _build_registry() -> dict[str, type[Action]]:
+    registry = {}
+    for name, cls in globals().items():
+        if isinstance(cls, type) and issubclass(cls, Action) and cls is not Action:
+            cls.fields()
+            registry[name] = cls
+    return registry
+
+
+# All action classes by event type, with their fields looked up at import time
+ACTIONS: dict[str, type[Action]] = _build_registry()
+
+
+def load_action(json_dict: dict) -> Action:
+    """
+    Creates the action class matching the eventType of a dict and loads the dict into it.
+
+    :param json_dict: dict: The action as a dict
+    """
+    event_type = json_dict.get("eventType")
+    try:
+        cls = ACTIONS[event_type]
+    except (KeyError, TypeError) as e:
+        raise AttributeError(f"The name {event_type} is not an event class!\nReraised Exception: {e!r}")
+    return cls.from_dict(json_dict)
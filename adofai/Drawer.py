@@ -1,13 +1,13 @@
+import numpy as np
+
+from .spatial import SpatialIndex
+
 PYGAME_FLAG = True
 try:
     import pygame
 except ImportError:
     PYGAME_FLAG = False
 
-# Initialize Pygame
-if PYGAME_FLAG:
-    pygame.init()
-
 # Constants
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
 BG_COLOR = (30, 30, 30)
@@ -24,14 +24,37 @@ OFFSET_AMOUNT = 10  # Offset amount for overlapping arrows
 OFFSET_RANGE = (-10, 10)
 TWIRL_TILE_COLOR = (0, 255, 255)
 SPEED_CHANGE_COLOR = (255, 255, 0)
-
-# Create the screen
-if PYGAME_FLAG:
+# Tile colors indexed by twirl | speed change << 1
+TILE_EVENT_COLORS = ((0, 0, 0), TWIRL_TILE_COLOR, SPEED_CHANGE_COLOR, (255, 255, 255))
+HOVER_DISTANCE = 5  # Distance in pixels from an arrow at which it counts as hovered
+ARROWHEAD_LENGTH = 10
+# Below this zoom, i.e. with tiles fewer pixels apart, the path is drawn as simplified lines without tiles or arrows
+LOD_ZOOM = 4.0
+LOD_PIXELS = 2.0  # Largest size in pixels of the grid cells a simplified path is snapped to
+
+# The window and its font, created by init_display once the viewer is started
+screen = None
+font = None
+
+
+def init_display():
+    """Initializes pygame and opens the viewer window, unless it is already open."""
+    global screen, font
+    if screen is not None:
+        return
+    pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("ADOFAI Map Viewer")
     font = pygame.font.Font(None, FONT_SIZE)
 
 
+def close_display():
+    """Closes the viewer window and shuts pygame down."""
+    global screen, font
+    screen = font = None
+    pygame.quit()
+
+
 def map_angle_to_offset(angle):
     # Figure out how 'wide' each range is
     span = 360
@@ -40,199 +63,390 @@ def map_angle_to_offset(angle):
     else:
         offset_span = (OFFSET_RANGE[0], OFFSET_RANGE[1])
 
-    # Convert the left range into a 0-1 range (float)
-    value_scaled = float(angle) / float(span)
+    # Convert the left range into a 0-1 range (float), for single angles or arrays of them
+    value_scaled = np.asarray(angle, dtype=np.float64) / float(span)
 
     # Convert the 0-1 range into a value in the right range.
     return OFFSET_RANGE[0] + (value_scaled * offset_span[1])
 
 
-def draw_tile(tile):
+class PathView:
+    """
+    Positions, colors and arrow offsets of all tiles of a map, gathered once for the viewer.
+
+    The tiles themselves are never changed. Every frame only the tiles and arrows inside the screen are looked up
+    in a spatial index and moved to screen space, so drawing a frame costs time by the number of visible tiles
+    instead of the length of the map.
+
+    fields:
+        xs, ys: The position of every tile, with y pointing down like on the screen
+        tile_colors: The index into TILE_EVENT_COLORS of every tile
+        arrow_offsets: The shift of every arrow in pixels, so an arrow going back over the previous one stays visible
+        index: SpatialIndex over the tile positions
+        levels: The tiles kept in every level of detail. Level k keeps a tile only if it lies in another grid cell
+            of 2 ** k units than the tile kept before it, so every level traces the path to within one cell.
+
+    functions:
+        to_screen: Moves tiles to screen space
+        visible: Returns the tiles and arrows inside the screen
+        hovered_arrow: Returns the arrow under the mouse
+        level_for_zoom: Returns the coarsest level of detail that still looks exact at a zoom factor
+        visible_lines: Returns the simplified path inside the screen as runs of points
+
+    :param tiles: The tiles of a map, as TileList or list of Tile
+    """
+
+    def __init__(self, tiles):
+        table = getattr(tiles, "table", None)
+        if table is not None:
+            xs, ys, angles = table.offsets_x, table.offsets_y, table.out_angles
+            actions = tiles.actions
+        else:
+            xs = np.array([tile.offset_x for tile in tiles], dtype=np.float64)
+            ys = np.array([tile.offset_y for tile in tiles], dtype=np.float64)
+            angles = np.array([tile.out_angle.angle for tile in tiles], dtype=np.float64)
+            actions = {index: tile.actions for index, tile in enumerate(tiles) if tile.actions}
+        self.xs = np.array(xs, dtype=np.float64)
+        self.ys = -np.asarray(ys, dtype=np.float64)
+
+        self.tile_colors = np.zeros(len(self.xs), dtype=np.int64)
+        for floor, floor_actions in actions.items():
+            if 0 <= floor < len(self.xs):
+                self.tile_colors[floor] = ("Twirl" in floor_actions) | ("SetSpeed" in floor_actions) << 1
+
+        # An arrow goes back over the previous one if it ends where the previous one started
+        self.arrow_offsets = np.zeros((max(len(self.xs) - 1, 0), 2))
+        back = np.flatnonzero(np.isclose(self.xs[:-2], self.xs[2:]) & np.isclose(self.ys[:-2], self.ys[2:])) + 1
+        radians = np.radians(angles[back])
+        lengths = map_angle_to_offset(angles[back])
+        self.arrow_offsets[back] = np.stack((lengths * np.cos(radians), lengths * np.sin(radians)), axis=1)
+        self.index = SpatialIndex(self.xs, self.ys)
+
+        self.levels = [np.arange(len(self.xs))]
+        extent = max(np.ptp(self.xs), np.ptp(self.ys)) if len(self.xs) else 0.0
+        while len(self.levels[-1]) > 2 and 2 ** (len(self.levels) - 1) < extent:
+            self.levels.append(self._simplify(self.levels[-1], 2.0 ** len(self.levels)))
+
+    def _simplify(self, tiles: np.ndarray, cell_size: float) -> np.ndarray:
+        """Drops every tile that lies in the same grid cell as the tile before it. The last tile is always kept."""
+        cells_x = np.floor(self.xs[tiles] / cell_size)
+        cells_y = np.floor(self.ys[tiles] / cell_size)
+        keep = np.ones(len(tiles), dtype=bool)
+        keep[1:] = (cells_x[1:] != cells_x[:-1]) | (cells_y[1:] != cells_y[:-1])
+        keep[-1] = True
+        return tiles[keep]
+
+    def __len__(self):
+        return len(self.xs)
+
+    def to_screen(self, tiles: np.ndarray, zoom: float, offset_x: float, offset_y: float):
+        """Returns the screen positions of the upper left corners of tiles"""
+        return self.xs[tiles] * zoom + offset_x, self.ys[tiles] * zoom + offset_y
+
+    def _arrows_near(self, min_x: float, min_y: float, max_x: float, max_y: float, margin: float) -> np.ndarray:
+        """Returns the arrows that may be drawn into a screen rectangle, and the tiles inside it"""
+        # Tiles are one unit apart, so any arrow crossing the rectangle starts or ends at most one unit outside it
+        tiles = self.index.tiles_in_rect(min_x - margin - 1, min_y - margin - 1, max_x + margin + 1,
+                                         max_y + margin + 1)
+        arrows = np.union1d(tiles, tiles - 1)
+        return arrows[(arrows >= 0) & (arrows < len(self) - 1)]
+
+    def visible(self, zoom: float, offset_x: float, offset_y: float, width: int = SCREEN_WIDTH,
+                height: int = SCREEN_HEIGHT) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the tiles and the arrows, by the index of their start tile, that are at least partly on the screen.
+
+        :param zoom: The zoom factor
+        :param offset_x, offset_y: The panning of the view in pixels
+        :param width, height: The size of the screen
+        """
+        # Tiles and arrows reach up to a tile, an arrow offset and an arrowhead past their position
+        margin = (TILE_SIZE + OFFSET_AMOUNT + ARROWHEAD_LENGTH) / zoom
+        min_x, max_x = -offset_x / zoom, (width - offset_x) / zoom
+        min_y, max_y = -offset_y / zoom, (height - offset_y) / zoom
+        tiles = self.index.tiles_in_rect(min_x - margin, min_y - margin, max_x + margin, max_y + margin)
+        return tiles, self._arrows_near(min_x, min_y, max_x, max_y, margin)
+
+    def hovered_arrow(self, mouse_pos, zoom: float, offset_x: float, offset_y: float) -> int | None:
+        """
+        Returns the arrow under the mouse, by the index of its start tile. Only arrows near the mouse are tested.
+        Of several hovered arrows the last one is returned.
+
+        :param mouse_pos: The position of the mouse on the screen
+        :param zoom: The zoom factor
+        :param offset_x, offset_y: The panning of the view in pixels
+        """
+        mouse = np.asarray(mouse_pos, dtype=np.float64)
+        world_x, world_y = (mouse[0] - offset_x) / zoom, (mouse[1] - offset_y) / zoom
+        margin = (TILE_SIZE + OFFSET_AMOUNT + HOVER_DISTANCE) / zoom
+        arrows = self._arrows_near(world_x, world_y, world_x, world_y, margin)
+        if not len(arrows):
+            return None
+
+        starts = np.stack(self.to_screen(arrows, zoom, offset_x, offset_y), axis=1) + TILE_SIZE // 2
+        starts += self.arrow_offsets[arrows]
+        vectors = np.stack(self.to_screen(arrows + 1, zoom, offset_x, offset_y), axis=1) + TILE_SIZE // 2
+        vectors += self.arrow_offsets[arrows] - starts
+        lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            projections = np.sum((mouse - starts) * vectors, axis=1) / lengths
+            nearest = starts + vectors * (projections / lengths)[:, None]
+        distances = np.hypot(*(nearest - mouse).T)
+        hovered = arrows[(lengths > 0) & (projections >= 0) & (projections <= lengths) & (distances <= HOVER_DISTANCE)]
+        return int(hovered[-1]) if len(hovered) else None
+
+    def level_for_zoom(self, zoom: float) -> int:
+        """Returns the coarsest level of detail whose grid cells are at most LOD_PIXELS wide on the screen"""
+        level = int(np.floor(np.log2(LOD_PIXELS / zoom))) if zoom < LOD_PIXELS else 0
+        return min(max(level, 0), len(self.levels) - 1)
+
+    def visible_lines(self, zoom: float, offset_x: float, offset_y: float, width: int = SCREEN_WIDTH,
+                      height: int = SCREEN_HEIGHT) -> list[list[tuple[float, float]]]:
+        """
+        Returns the simplified path at the level of detail for a zoom factor, as runs of screen positions.
+        Parts of the path outside the screen are left out.
+
+        :param zoom: The zoom factor
+        :param offset_x, offset_y: The panning of the view in pixels
+        :param width, height: The size of the screen
+        """
+        level = self.level_for_zoom(zoom)
+        tiles = self.levels[level]
+        xs, ys = self.to_screen(tiles, zoom, offset_x, offset_y)
+        xs, ys = xs + TILE_SIZE // 2, ys + TILE_SIZE // 2
+        # Consecutive points of a level are at most two cells apart, so a line crossing the screen has an end nearby
+        margin = 4 * 2 ** level * zoom + 1
+        inside = (xs >= -margin) & (xs <= width + margin) & (ys >= -margin) & (ys <= height + margin)
+        drawn = np.concatenate(([False], inside[:-1] | inside[1:], [False]))
+        # Every run of drawn lines from point start to point stop becomes one polyline
+        edges = np.flatnonzero(drawn[1:] != drawn[:-1])
+        points = np.stack((xs, ys), axis=1)
+        return [points[start:stop + 1].tolist() for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist())]
+
+
+class StaticLayer:
+    """
+    The tiles and arrows of a map drawn once for one zoom factor, on a surface reaching past every edge of the screen.
+
+    Panning only moves the surface on the screen. It is drawn again when the zoom changes or the view is panned
+    further than the margin.
+
+    fields:
+        surface: The drawn map, or None before the first draw
+        zoom: The zoom factor the surface was drawn with
+        offset_x, offset_y: The panning the surface was drawn with
+
+    functions:
+        covers: Returns whether the surface fills the screen at a zoom and panning
+        update: Draws the surface again if it does not cover the screen at a zoom and panning
+        blit: Copies the surface, or a part of it, to the screen
+
+    :param view: The PathView of the map
+    :param margin_x, margin_y: How far the surface reaches past the left and right or the upper and lower edge
+    """
+
+    def __init__(self, view: PathView, margin_x: int = SCREEN_WIDTH // 2, margin_y: int = SCREEN_HEIGHT // 2):
+        self.view = view
+        self.margin_x, self.margin_y = margin_x, margin_y
+        self.surface = None
+        self.zoom = None
+        self.offset_x = self.offset_y = 0
+
+    def covers(self, zoom: float, offset_x: float, offset_y: float) -> bool:
+        """Returns whether the surface fills the screen at a zoom and panning"""
+        return self.surface is not None and zoom == self.zoom and abs(offset_x - self.offset_x) <= self.margin_x \
+            and abs(offset_y - self.offset_y) <= self.margin_y
+
+    def update(self, zoom: float, offset_x: float, offset_y: float):
+        """Draws the surface again for a zoom and panning, unless it already covers the screen"""
+        if self.covers(zoom, offset_x, offset_y):
+            return
+        width, height = SCREEN_WIDTH + 2 * self.margin_x, SCREEN_HEIGHT + 2 * self.margin_y
+        if self.surface is None:
+            self.surface = pygame.Surface((width, height)).convert()
+        self.surface.fill(BG_COLOR)
+        self.zoom, self.offset_x, self.offset_y = zoom, offset_x, offset_y
+        draw_frame(self.view, zoom, offset_x + self.margin_x, offset_y + self.margin_y, surface=self.surface,
+                   width=width, height=height)
+
+    def position(self, offset_x: float, offset_y: float) -> tuple[int, int]:
+        """Returns where the upper left corner of the surface is on the screen"""
+        return round(offset_x - self.offset_x) - self.margin_x, round(offset_y - self.offset_y) - self.margin_y
+
+    def blit(self, offset_x: float, offset_y: float, rect=None):
+        """Copies the surface to the screen, or only the part of it below a rect of the screen"""
+        x, y = self.position(offset_x, offset_y)
+        if rect is None:
+            screen.blit(self.surface, (x, y))
+        else:
+            screen.blit(self.surface, rect, area=rect.move(-x, -y))
+
+
+def draw_tile(x, y, tile_color, surface=None):
     """Draw a single tile on the screen."""
-    events = [None, None]
-    if "Twirl" in tile.actions:
-        events[0] = 1
-    if "SetSpeed" in tile.actions:
-        events[1] = 1
-    if all(events):
-        tile_color = (255, 255, 255)
-    elif events[0]:
-        tile_color = TWIRL_TILE_COLOR
-    elif events[1]:
-        tile_color = SPEED_CHANGE_COLOR
-
-    else:
-        tile_color = (0, 0, 0)
-    x, y = tile.offset_x, tile.offset_y
     rect = pygame.Rect(x, y, TILE_SIZE, TILE_SIZE)
-    pygame.draw.rect(screen, tile_color, rect)
+    return pygame.draw.rect(screen if surface is None else surface, tile_color, rect)
 
 
-def draw_arrow(start_tile, end_tile, thickness: int,  offset_vector):
-    """Draw an arrow from start_tile to end_tile."""
+def draw_arrow(start_pos, end_pos, arrow_color, thickness: int, surface=None):
+    """Draw an arrow between two screen positions. Returns the rect drawn to."""
     global ARROW_COUNT
-    arrow_color = ARROW_COLORS[start_tile.floor % 3]
-    start_pos = pygame.math.Vector2(start_tile.offset_x + TILE_SIZE // 2,
-                                    start_tile.offset_y + TILE_SIZE // 2) + offset_vector
-    end_pos = pygame.math.Vector2(end_tile.offset_x + TILE_SIZE // 2,
-                                  end_tile.offset_y + TILE_SIZE // 2) + offset_vector
-    pygame.draw.line(screen, arrow_color, start_pos, end_pos, thickness)
-    draw_arrowhead(end_pos, start_pos, arrow_color, thickness)
+    surface = screen if surface is None else surface
+    start_pos, end_pos = pygame.math.Vector2(start_pos), pygame.math.Vector2(end_pos)
+    rect = pygame.draw.line(surface, arrow_color, start_pos, end_pos, thickness)
+    if start_pos != end_pos:
+        rect = rect.union(draw_arrowhead(end_pos, start_pos, arrow_color, thickness, surface))
     ARROW_COUNT += 1
+    return rect
 
 
-def draw_arrowhead(start_pos, end_pos, color, thickness):
+def draw_arrowhead(start_pos, end_pos, color, thickness, surface=None):
     """Draw arrowhead at the end of an arrow line."""
-    arrow_length = 10
+    arrow_length = ARROWHEAD_LENGTH
     arrow_width = 5
     angle = pygame.math.Vector2(end_pos) - pygame.math.Vector2(start_pos)
     angle = pygame.math.Vector2.normalize(angle)
     arrow_point1 = end_pos - angle.rotate(135) * arrow_length
     arrow_point2 = end_pos - angle.rotate(-135) * arrow_length
-    pygame.draw.polygon(screen, color, [start_pos, arrow_point1, arrow_point2], width=thickness)
-
-
-def is_hovering_over_arrow(mouse_pos, start_tile, end_tile, offset_vector=None):
-    """Check if the mouse is hovering over the arrow."""
-    if offset_vector is None:
-        offset_vector = pygame.math.Vector2(0, 0)
-    start_pos = pygame.math.Vector2(start_tile.offset_x + TILE_SIZE // 2,
-                                    start_tile.offset_y + TILE_SIZE // 2) + offset_vector
-    end_pos = pygame.math.Vector2(end_tile.offset_x + TILE_SIZE // 2,
-                                  end_tile.offset_y + TILE_SIZE // 2) + offset_vector
-    arrow_vector = end_pos - start_pos
-    mouse_vector = pygame.math.Vector2(mouse_pos) - start_pos
-    projection_length = mouse_vector.dot(arrow_vector) / arrow_vector.length()
-    projection_vector = projection_length * arrow_vector.normalize()
-    nearest_point = start_pos + projection_vector
-    distance_to_mouse = nearest_point.distance_to(mouse_pos)
-    return 0 <= projection_length <= arrow_vector.length() and distance_to_mouse <= 5
+    return pygame.draw.polygon(screen if surface is None else surface, color,
+                               [start_pos, arrow_point1, arrow_point2], width=thickness)
 
 
 def draw_tooltip(text, mouse_pos):
     """Draw tooltip with text near the mouse position."""
     tooltip_surface = font.render(text, True, (255, 255, 255))
-    screen.blit(tooltip_surface, (mouse_pos[0] + 10, mouse_pos[1] - 20))
+    return screen.blit(tooltip_surface, (mouse_pos[0] + 10, mouse_pos[1] - 20))
+
+
+def draw_lines(view: PathView, zoom: float, offset_x: float, offset_y: float, surface=None,
+               width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT):
+    """Draw the path as simplified lines in batches, for zoom factors where single tiles are too small to see."""
+    for points in view.visible_lines(zoom, offset_x, offset_y, width, height):
+        pygame.draw.lines(screen if surface is None else surface, TILE_COLOR, False, points)
+
+
+def _arrow_positions(view: PathView, arrows: np.ndarray, zoom: float, offset_x: float, offset_y: float):
+    """Returns the start and end positions of arrows on the screen, as lists of (x0, y0, x1, y1)"""
+    starts_x, starts_y = view.to_screen(arrows, zoom, offset_x, offset_y)
+    ends_x, ends_y = view.to_screen(arrows + 1, zoom, offset_x, offset_y)
+    shift = view.arrow_offsets[arrows] + TILE_SIZE // 2
+    return np.stack((starts_x + shift[:, 0], starts_y + shift[:, 1], ends_x + shift[:, 0], ends_y + shift[:, 1]),
+                    axis=1).tolist()
+
 
+def draw_frame(view: PathView, zoom: float, offset_x: float, offset_y: float, hover_index: int = None,
+               surface=None, width: int = SCREEN_WIDTH, height: int = SCREEN_HEIGHT):
+    """Draw the tiles and arrows on the screen, leaving out everything outside of it."""
+    if zoom < LOD_ZOOM:
+        draw_lines(view, zoom, offset_x, offset_y, surface, width, height)
+        return
+    tiles, arrows = view.visible(zoom, offset_x, offset_y, width, height)
 
-def mirror_map_y(tiles, center_line):
-    """Mirror the map on the x-axis relative to the center line."""
-    for tile in tiles:
-        tile.offset_y = 2 * center_line - tile.offset_y
+    for arrow, (x0, y0, x1, y1) in zip(arrows.tolist(), _arrow_positions(view, arrows, zoom, offset_x, offset_y)):
+        draw_arrow((x0, y0), (x1, y1), ARROW_COLORS[arrow % 3], 10 if arrow == hover_index else 2, surface)
+
+    tiles_x, tiles_y = view.to_screen(tiles, zoom, offset_x, offset_y)
+    for x, y, color in zip(tiles_x.tolist(), tiles_y.tolist(), view.tile_colors[tiles].tolist()):
+        draw_tile(x, y, TILE_EVENT_COLORS[color], surface)
+
+
+def draw_hover(view: PathView, tiles, hover_index: int, mouse_pos, zoom: float, offset_x: float,
+               offset_y: float) -> list:
+    """Draw the highlight and the tooltip of the hovered arrow over the static layer. Returns the rects drawn to."""
+    arrows = np.array([hover_index])
+    (x0, y0, x1, y1), = _arrow_positions(view, arrows, zoom, offset_x, offset_y)
+    rects = [draw_arrow((x0, y0), (x1, y1), ARROW_COLORS[hover_index % 3], 10)]
+    # The tiles at both ends stay on top of the highlight
+    ends = arrows.repeat(2) + [0, 1]
+    tiles_x, tiles_y = view.to_screen(ends, zoom, offset_x, offset_y)
+    for x, y, color in zip(tiles_x.tolist(), tiles_y.tolist(), view.tile_colors[ends].tolist()):
+        rects.append(draw_tile(x, y, TILE_EVENT_COLORS[color]))
+    tile = tiles[hover_index]
+    rects.append(draw_tooltip(f"Duration: {tile.duration_in_beats:.2f} beats", mouse_pos))
+    return rects
 
 
 def main(tiles):
+    init_display()
     clock = pygame.time.Clock()
     running = True
-    offset_x, offset_y = 0, 0  # To handle panning
+    view = PathView(tiles)
+    layer = StaticLayer(view)
+    # y points down on the screen, so the map is mirrored on the x-axis around the center line
+    center_line = SCREEN_HEIGHT // 2
+    offset_x, offset_y = 0, 2 * center_line  # To handle panning
     zoom = 1.0  # Zoom factor
     dragging = False
     drag_start_x, drag_start_y = 0, 0
     mouse_pos = pygame.mouse.get_pos()
     hover_tile_index = None
-    center_line = SCREEN_HEIGHT // 2  # Center line for mirroring
-
-    mirror_map_y(tiles, center_line)  # Mirror the map on the x-axis
+    dirty_rects = []  # The parts of the screen drawn over the static layer
+    redraw = True  # Whether the whole screen has to be drawn again
 
     while running:
+        # Sleep until something happens instead of drawing frames nobody would notice
+        events = pygame.event.get() or [pygame.event.wait()]
+        mouse_moved = False
 
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                redraw = True
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click to start dragging
                     dragging = True
                     drag_start_x, drag_start_y = event.pos
-                elif event.button == 4:  # Scroll up to zoom in
+                elif event.button in (4, 5):  # Scroll up to zoom in, down to zoom out
                     # Calculate the world position of the center of the screen
                     screen_center_x = SCREEN_WIDTH / 2
                     screen_center_y = SCREEN_HEIGHT / 2
                     world_center_x = (screen_center_x - offset_x) / zoom
                     world_center_y = (screen_center_y - offset_y) / zoom
 
-                    # Increase the zoom factor
-                    zoom *= 1.1
-
-                    # Recalculate the new offsets to keep the world center at the screen center
-                    offset_x = screen_center_x - world_center_x * zoom
-                    offset_y = screen_center_y - world_center_y * zoom
-                elif event.button == 5:  # Scroll down to zoom out
-                    # Calculate the world position of the center of the screen
-                    screen_center_x = SCREEN_WIDTH / 2
-                    screen_center_y = SCREEN_HEIGHT / 2
-                    world_center_x = (screen_center_x - offset_x) / zoom
-                    world_center_y = (screen_center_y - offset_y) / zoom
-
-                    # Decrease the zoom factor
-                    zoom /= 1.1
+                    # Change the zoom factor
+                    zoom = zoom * 1.1 if event.button == 4 else zoom / 1.1
 
                     # Recalculate the new offsets to keep the world center at the screen center
                     offset_x = screen_center_x - world_center_x * zoom
                     offset_y = screen_center_y - world_center_y * zoom
+                    redraw = True
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:  # Left click to stop dragging
                     dragging = False
             elif event.type == pygame.MOUSEMOTION:
+                mouse_pos = event.pos
+                mouse_moved = True
                 if dragging:
                     dx = event.pos[0] - drag_start_x
                     dy = event.pos[1] - drag_start_y
                     offset_x += dx
                     offset_y += dy
                     drag_start_x, drag_start_y = event.pos
+                    redraw = True
+
+        hovered = view.hovered_arrow(mouse_pos, zoom, offset_x, offset_y) if zoom >= LOD_ZOOM else None
+        if redraw:
+            # Panning only moves the static layer, it is drawn again for a new zoom or far away panning
+            layer.update(zoom, offset_x, offset_y)
+            layer.blit(offset_x, offset_y)
+            dirty_rects = draw_hover(view, tiles, hovered, mouse_pos, zoom, offset_x, offset_y) \
+                if hovered is not None else []
+            pygame.display.flip()
+        elif hovered != hover_tile_index or (hovered is not None and mouse_moved):
+            # Only the highlight and the tooltip changed, so only their old and new rects are updated
+            for rect in dirty_rects:
+                layer.blit(offset_x, offset_y, rect)
+            old_rects = dirty_rects
+            dirty_rects = draw_hover(view, tiles, hovered, mouse_pos, zoom, offset_x, offset_y) \
+                if hovered is not None else []
+            pygame.display.update(old_rects + dirty_rects)
+        hover_tile_index = hovered
+        redraw = False
 
-        # Clear the screen
-        screen.fill(BG_COLOR)
-
-        # Draw all tiles and arrows
-        for i in range(len(tiles) - 1):
-            tile = tiles[i]
-            next_tile = tiles[i + 1]
-            # Apply panning and zoom
-            tile.offset_x = (tile.offset_x * zoom) + offset_x
-            tile.offset_y = (tile.offset_y * zoom) + offset_y
-            next_tile.offset_x = (next_tile.offset_x * zoom) + offset_x
-            next_tile.offset_y = (next_tile.offset_y * zoom) + offset_y
-
-            # Calculate offset vector for overlapping arrows
-            # IDEA: Let offsets be unique to every angle.
-            offset_vector = pygame.math.Vector2(0, 0)
-            if i > 0 and tiles[i - 1] == next_tile:
-                offset_vector = pygame.math.Vector2(map_angle_to_offset(tile.angle), 0).rotate(tile.angle)
-
-            # Check if the mouse is hovering over this arrow
-            if is_hovering_over_arrow(mouse_pos, tile, next_tile, offset_vector):
-                draw_arrow(tile, next_tile, 10, offset_vector)
-                hover_tile_index = i
-            else:
-                draw_arrow(tile, next_tile, 2, offset_vector)
-
-            draw_tile(tile)
-
-            # Reset offsets for correct behavior in next frame
-            tile.offset_x = (tile.offset_x - offset_x) / zoom
-            tile.offset_y = (tile.offset_y - offset_y) / zoom
-            next_tile.offset_x = (next_tile.offset_x - offset_x) / zoom
-            next_tile.offset_y = (next_tile.offset_y - offset_y) / zoom
-
-        # Draw the last tile
-        last_tile = tiles[-1]
-        last_tile.offset_x = (last_tile.offset_x * zoom) + offset_x
-        last_tile.offset_y = (last_tile.offset_y * zoom) + offset_y
-        draw_tile(last_tile)
-        last_tile.offset_x = (last_tile.offset_x - offset_x) / zoom
-        last_tile.offset_y = (last_tile.offset_y - offset_y) / zoom
-
-        # Draw tooltip if hovering over an arrow
-        if hover_tile_index is not None:
-            tile = tiles[hover_tile_index]
-            tooltip_text = f"Duration: {tile.duration_in_beats:.2f} beats"
-            draw_tooltip(tooltip_text, mouse_pos)
-
-        # Update the display
-        pygame.display.flip()
         clock.tick(60)
 
-    pygame.quit()
+    close_display()
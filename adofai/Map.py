@@ -1,29 +1,91 @@
+import io
 import json
 import os
-import re
+from functools import cached_property
+from typing import BinaryIO
+
+import numpy as np
 
 from adofai import Actions
 from .Tile import Tile
-from .classes import MapSetting, Angle, Decoration, group_dicts_by_key, Savable
+from .TileTable import TileTable, TileList
+from .cache import MapCache
+from .spatial import SpatialIndex
+from .tempo import TempoMap
+from .events import FloorEvents
+from .decorations import DecorationStore
+from .tags import TagIndex
+from .profiling import LoadStats, NO_STAGE
+from .parser import read_map_data, read_map_header, remove_trailing_commas
+from .classes import MapSetting, Angle, group_dicts_by_key, Savable
 from .Drawer import main, PYGAME_FLAG
-from .midi.adofai_to_midi import tiles_to_midi_pretty
+from .midi.table_to_midi import table_to_midi, Mapping
+from .midi.mapping import angle_pitch
+from .audio.table_to_wav import table_to_wav
+from .render import render_map
+
+# remove_trailing_commas moved to adofai.parser and is still importable from here
+__all__ = ["Map", "read_settings", "action_name_to_class", "SETTING_FIELDS", "remove_trailing_commas"]
 
 
 def action_name_to_class(action_name: str):
     """
     Converts an action name to the corresponding Actions class.
     """
-    # print(f"Looking up action {action_name}")
     try:
-        return getattr(Actions, action_name)()
-    except AttributeError as e:
-        raise AttributeError(f"The name {action_name} is not an event class!\nReraised Exception: {e}")
+        return Actions.ACTIONS[action_name]()
+    except KeyError as e:
+        raise AttributeError(f"The name {action_name} is not an event class!\nReraised Exception: {e!r}")
+
+
+# Settings written by Map.save, in the order the adofai editor writes them
+SETTING_FIELDS = tuple(MapSetting._defaults_dict)
+
+_encoder = json.JSONEncoder(ensure_ascii=False)
+_compact_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _shift_floors(grouped: dict, floor: int, by: int, count: int):
+    """
+    Moves the entries of all floors from floor on by the given number of floors, in place.
+
+    :param count: The number of floors of the map, so that only the floors after floor need to be looked at
+    """
+    if count - floor < len(grouped):
+        floors = [key for key in range(floor, count) if key in grouped]
+    else:
+        floors = sorted(key for key in grouped if key >= floor)
+    # Move the last floor first when moving forward, so that no floor overwrites the next one
+    for key in reversed(floors) if by > 0 else floors:
+        grouped[key + by] = grouped.pop(key)
+
+
+def _read_settings_data(values: dict) -> MapSetting:
+    """
+    Builds the settings of a map from the settings dict of its file.
+    Settings MapSetting does not know, e.g. of newer game versions, are kept to be written back.
+    """
+    settings = MapSetting()
+    settings.load(values)
+    for key, value in values.items():
+        if key not in SETTING_FIELDS:
+            setattr(settings, key, value)
+    return settings
 
 
-def remove_trailing_commas(json_string):
-    # Regular expression to find trailing commas
-    json_string = re.sub(r',\s*([]}])', r'\1', json_string)
-    return json_string
+def read_settings(path: str) -> MapSetting:
+    """
+    Reads only the settings of a map file.
+
+    Parsing stops right after the settings, so neither actions, decorations nor tiles get loaded.
+    The result is the same as the settings of a fully loaded Map.
+
+    :param path: The path to the map file.
+    """
+    data = read_map_data(path, keys=("settings",))
+    if "settings" not in data:
+        raise AttributeError("This file contains no map data!")
+    return _read_settings_data(data["settings"])
 
 
 class Map(Savable):
@@ -31,165 +93,462 @@ class Map(Savable):
     Represents a full adofai map
 
     Contains a tile list with all tiles this map contains.
-    On initialization analyzes the entirety of the map.
+    On initialization analyzes the entirety of the map, unless lazy is set or a cache is given.
 
     Either path or map_data needs to be given.
 
     fields:
-        tile_list: list[Tile]: A list of all tiles this map contains.
+        tile_list: list[Tile]: A list of all tiles this map contains. Tiles are only created when indexed.
+        tile_table: TileTable: The columnar tile data all tiles are created from.
+        actions: dict[int, list[dict]]: The action dicts of this map, grouped by floor.
+        floorless_actions: list[dict]: The action dicts without a floor, in the order they were read.
+        tile_actions: dict[int, dict[str, Action]]: The action classes of this map, grouped by floor.
+        decorations: DecorationStore: The decorations of this map in columns. Maps every floor to its decorations.
+        decoration_count: int: The number of decorations, without building the DecorationStore.
+        spatial_index: SpatialIndex: A grid over the tile positions, built on first access.
+        tempo_map: TempoMap: The bpm segments of this map, built on first access.
+        floor_events: FloorEvents: Per floor arrays of the actions of this map, built on first access.
+        tag_index: TagIndex: The actions and decorations carrying every event tag, built on first access.
 
     functions:
+        peek: Reads only the settings of a map file without loading the map
+        tile_at_time, tile_at_beat: Finds the tile playing at a point in time
+        tiles_at_times, tiles_at_beats: Finds the floors playing at many points in time at once
+        tiles_in_rect, nearest_tile, overlapping_tiles: Finds tiles by their position
+        set_angle, insert_floor, delete_floor: Edits the path, recomputing only the tiles after the edit
+        add_action, remove_action: Edits the actions, recomputing the tiles after twirls and speed changes
+        save: Writes this map to a .adofai file
+        to_midi, to_wav: Exports the notes or the hitsounds of this map
+        dumps: Returns this map as the content of a .adofai file
+        render: Renders a preview image of this map without opening a window
         plot: Plots a map with tkinter
 
     :param path: The path to the map file.
+    :param lazy: If true, tiles, actions and decorations are only read and built once they are first accessed.
+    :param cache: A MapCache to load the tile table from and store it in. True uses a cache in the default location.
+                  With a cache, only the tile table is built on initialization. Actions and decorations are read
+                  once they are first accessed, so loading a cached map does not parse them at all.
+    :param profile: A LoadStats to record the duration of every loading stage in. True creates one.
+                    The measurements are available as load_stats afterwards.
     """
-    tile_list: list[Tile]
     base_bpm: float
 
     # Map parts
-    actions: list | dict[str | int, str]
     angle_data: list[Angle]
     settings: MapSetting
-    decorations: list[Decoration] | list[dict] | dict
 
     path: str
-    pos_x: float
-    pos_y: float
-
-    duration: float
-    duration_in_beats: float
+    lazy: bool
+    cache: MapCache | None
+    load_stats: LoadStats | None
 
-    def __init__(self, path: str):
+    # Parts of the map that get built on first access, in the order they depend on each other
+    _stages = ("_map_data", "actions", "decorations", "tile_table", "tile_actions", "tile_list")
+    # Lookup structures that are only built when first queried
+    _indexes = ("spatial_index", "tempo_map", "floor_events", "tag_index")
 
-        self.tile_list = []
+    def __init__(self, path: str, lazy: bool = False, cache: MapCache | bool = None, profile: LoadStats | bool = None):
 
         self.base_bpm = 0.0
 
-        self.actions = []
         self.angle_data = []
         self.settings = MapSetting()
-        self.decorations = []
         self.path = os.path.abspath(path)
+        self.lazy = lazy
+        self.cache = MapCache() if cache is True else cache or None
+        self.load_stats = LoadStats() if profile is True else profile or None
+        self._source_path = self.path
+        self._path_key = "pathData"
+        self._setting_keys = ()
+        self._floorless_actions = []
+        self._modified = False
 
-        self.pos_x = 0.0
-        self.pos_y = 0.0
-
-        self.duration = 0.0
-        self.duration_in_beats = 0.0
         self.load()
 
+    @staticmethod
+    def peek(path: str) -> MapSetting:
+        """
+        Reads the settings of a map file without building a Map.
+
+        :param path: The path to the map file.
+        """
+        return read_settings(os.path.abspath(path))
+
     def load(self, path: str = None):
         path = path or self.path
         if not path:
             raise AttributeError("No path given!")
 
-        with open(path, 'r', encoding="utf-8-sig") as f:
-            data = json.loads(remove_trailing_commas(f.read()))
+        # Lazy maps read their actions and decorations on first access. So do maps with a cache, which only need
+        # them to build the tile table when it is not cached.
+        read_body = not self.lazy and self.cache is None
+        with self._stage("parse"):
+            data = read_map_data(path) if read_body else read_map_header(path)
+        self._source_path = path
+        self._path_key = "angleData" if "angleData" in data else "pathData"
+        self._modified = False
+        for stage in self._stages + self._indexes:
+            self.__dict__.pop(stage, None)
 
         try:
-            if "angleData" in data:
-                self.angle_data = [Angle(descriptor=float(a)) for a in data["angleData"]]
-            elif "pathData" in data:
-                self.angle_data = [Angle(descriptor=a) for a in data["pathData"]]
-            self.settings.load(data["settings"])
-            self.base_bpm = float(self.settings.bpm)
-            self.decorations = data.get("decorations", [])
-            self.actions = data.get("actions", [])
+            with self._stage("angles"):
+                if "angleData" in data:
+                    self.angle_data = [Angle(descriptor=float(a)) for a in data["angleData"]]
+                elif "pathData" in data:
+                    self.angle_data = [Angle(descriptor=a) for a in data["pathData"]]
+            with self._stage("settings"):
+                self.settings = _read_settings_data(data["settings"])
+                self._setting_keys = tuple(data["settings"])
+                self.base_bpm = float(self.settings.bpm)
 
         except KeyError:
             raise AttributeError("This file contains no map data!")
 
-        self.load_tiles()
+        if read_body:
+            self._map_data = data
+            self.load_tiles()
+        elif not self.lazy:
+            self.tile_table
 
     def load_tiles(self):
+        """Builds all parts of the map that have not been built yet."""
+        for stage in self._stages:
+            getattr(self, stage)
+
+    def _stage(self, name: str):
+        """Returns a context manager measuring a loading stage, which does nothing if profiling is off"""
+        if self.load_stats is None:
+            return NO_STAGE
+        return self.load_stats.stage(name)
+
+    def _count(self, name: str, count: int):
+        """Records a count of the loaded map. Callers check load_stats first, so counts cost nothing without it."""
+        self.load_stats.counts[name] = count
+
+    @cached_property
+    def _map_data(self) -> dict:
+        with self._stage("parse_body"):
+            return read_map_data(self._source_path, keys=("actions", "decorations"))
+
+    @cached_property
+    def actions(self) -> dict[int, list[dict]]:
+        map_data = self._map_data
+        with self._stage("group_actions"):
+            # Actions without a floor are kept apart, so saving writes them back
+            self._floorless_actions = []
+            actions = group_dicts_by_key(map_data.get("actions", []), "floor", self._floorless_actions)
+        if self.load_stats is not None:
+            self._count("events", sum(map(len, actions.values())))
+        return actions
+
+    @cached_property
+    def decorations(self) -> DecorationStore:
+        map_data = self._map_data
+        with self._stage("group_decorations"):
+            # The store replaces the parsed dicts, so they are dropped to free their memory
+            decorations = DecorationStore(map_data.pop("decorations", []))
+        if self.load_stats is not None:
+            self._count("decorations", decorations.size)
+        return decorations
+
+    @property
+    def floorless_actions(self) -> list[dict]:
+        self.actions  # Grouping the actions collects the ones without a floor
+        return self._floorless_actions
+
+    @property
+    def decoration_count(self) -> int:
+        """The number of decorations of this map. Counted from the parsed list if the store is not built yet."""
+        if "decorations" in self.__dict__:
+            return self.decorations.size
+        return sum(isinstance(decoration, dict) for decoration in self._map_data.get("decorations", []))
+
+    @cached_property
+    def tile_actions(self) -> dict[int, dict[str, Actions.Action]]:
+        actions = self.actions
+        load_action = Actions.load_action
+        with self._stage("action_classes"):
+            return {
+                floor: {action.get("eventType"): load_action(action) for action in floor_actions}
+                for floor, floor_actions in actions.items()
+            }
+
+    @cached_property
+    def tile_table(self) -> TileTable | None:
         if not self.angle_data:
-            return
-        floor = 0
-        pos_x = 0.0
-        pos_y = 0.0
+            return None
+        # Edited maps do not match their file anymore, so they can not use the cache
+        if self.cache is None or self._modified:
+            actions = self.actions
+            with self._stage("tile_table"):
+                table = TileTable([a.angle for a in self.angle_data], self.base_bpm, actions)
+        else:
+            with self._stage("cache_lookup"):
+                key = self.cache.key(self._source_path)
+                table = self.cache.get(key)
+            if table is None:
+                actions = self.actions
+                with self._stage("tile_table"):
+                    table = TileTable([a.angle for a in self.angle_data], self.base_bpm, actions)
+                    self.cache.put(key, table)
+        if self.load_stats is not None:
+            self._count("tiles", len(table))
+        return table
+
+    @cached_property
+    def tile_list(self) -> list[Tile] | TileList:
+        if self.tile_table is None:
+            return []
+        tile_actions, decorations = self.tile_actions, self.decorations
+        with self._stage("tile_list"):
+            return TileList(self.tile_table, actions=tile_actions, decorations=decorations)
+
+    def tile_at_time(self, ms: float) -> Tile | None:
+        """
+        Returns the tile playing at the given time, or None if the time is outside the map.
 
-        self.actions = group_dicts_by_key(self.actions, "floor")
-        self.decorations = group_dicts_by_key(self.decorations, "floor")
+        :param ms: The time since the start of the map in milliseconds
+        """
+        if self.tile_table is None:
+            return None
+        floor = int(self.tile_table.floors_at_times(ms))
+        return self.tile_list[floor] if floor >= 0 else None
 
-        def convert_tile_action_dict_to_classes(tile_action_dict):
-            return {
-                action.get("eventType"):
-                    (action_instance := action_name_to_class(action.get("eventType"))).load(action) or action_instance
+    def tile_at_beat(self, beat: float) -> Tile | None:
+        """
+        Returns the tile playing at the given beat, or None if the beat is outside the map.
 
-                for action in tile_action_dict
-            }
+        :param beat: The number of beats since the start of the map
+        """
+        if self.tile_table is None:
+            return None
+        floor = int(self.tile_table.floors_at_beats(beat))
+        return self.tile_list[floor] if floor >= 0 else None
 
-        # first tile
-        tile_actions: dict[str, Actions.Action] = convert_tile_action_dict_to_classes(self.actions.get(floor, []))
-        tile_decorations = [Decoration(d) for d in self.decorations.get(floor, [])]
-        self.tile_list.append(Tile(
-            floor=0, in_angle=Angle(0.0).opposite, out_angle=self.angle_data[0], bpm=self.base_bpm,
-            decorations=tile_decorations, actions=tile_actions
-        ))
-        cur_bpm = self.base_bpm
-        is_reversed = False
-        pos_x += self.tile_list[-1].dur_x
-        pos_y += self.tile_list[-1].dur_y
-        distance_from_start = 0.0
-        dis_from_start_beats = 0.0
+    def tiles_at_times(self, times) -> np.ndarray:
+        """
+        Returns the floors playing at the given times, -1 where a time is outside the map.
 
-        for floor in range(1, len(self.angle_data)):
+        :param times: array of times since the start of the map in milliseconds
+        """
+        if self.tile_table is None:
+            return np.full(np.shape(times), -1)
+        return self.tile_table.floors_at_times(times)
 
-            tile_actions: dict[str, Actions.Action] = convert_tile_action_dict_to_classes(self.actions.get(floor, []))
-            tile_decorations = [Decoration(d) for d in self.decorations.get(floor, [])]
+    def tiles_at_beats(self, beats) -> np.ndarray:
+        """
+        Returns the floors playing at the given beats, -1 where a beat is outside the map.
 
-            is_reversed = not is_reversed if "Twirl" in tile_actions else is_reversed
+        :param beats: array of beats since the start of the map
+        """
+        if self.tile_table is None:
+            return np.full(np.shape(beats), -1)
+        return self.tile_table.floors_at_beats(beats)
+
+    @cached_property
+    def tag_index(self) -> TagIndex:
+        actions, decorations, table = self.actions, self.decorations, self.tile_table
+        with self._stage("tag_index"):
+            return TagIndex(actions, decorations, table)
+
+    @cached_property
+    def spatial_index(self) -> SpatialIndex:
+        table = self.tile_table
+        if table is None:
+            return SpatialIndex([], [])
+        with self._stage("spatial_index"):
+            return SpatialIndex(table.offsets_x, table.offsets_y)
+
+    @cached_property
+    def tempo_map(self) -> TempoMap:
+        if self.tile_table is None:
+            return TempoMap([0], [0.0], [self.base_bpm])
+        return self.tile_table.tempo_map()
+
+    @cached_property
+    def floor_events(self) -> FloorEvents:
+        return FloorEvents.from_map(self)
+
+    def tiles_in_rect(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """
+        Returns the floors of all tiles whose position lies inside a rectangle, including its edges.
 
-            # Speed changes
-            speed_change: Actions.SetSpeed = tile_actions.get("SetSpeed", None)
-            if speed_change:
-                if speed_change.speedType == "Bpm":
-                    cur_bpm = speed_change.beatsPerMinute
-                elif speed_change.speedType == "Multiplier":
-                    cur_bpm *= speed_change.bpmMultiplier
-                else:
-                    raise AttributeError(f"Unknown speed type: {speed_change.speedType}!")
+        :param min_x: The left edge of the rectangle
+        :param min_y: The lower edge of the rectangle
+        :param max_x: The right edge of the rectangle
+        :param max_y: The upper edge of the rectangle
+        """
+        return self.spatial_index.tiles_in_rect(min_x, min_y, max_x, max_y)
+
+    def nearest_tile(self, x: float, y: float) -> Tile | None:
+        """
+        Returns the tile closest to a position, or None if the map has no tiles.
+
+        :param x: The x position
+        :param y: The y position
+        """
+        floor = self.spatial_index.nearest_tile(x, y)
+        return self.tile_list[floor] if floor is not None else None
+
+    def overlapping_tiles(self, radius: float = 0.5) -> np.ndarray:
+        """
+        Returns all pairs of floors whose tiles are at most radius apart, as an array of shape (pairs, 2).
+        Consecutive tiles are one unit apart, so a radius below 1 only finds tiles where the path crosses itself.
+
+        :param radius: The largest distance between two tiles that counts as overlapping
+        """
+        return self.spatial_index.overlapping_tiles(radius)
+
+    # Editing
+
+    def set_angle(self, floor: int, angle: Angle | float | str):
+        """
+        Changes the angle of a floor. Only the tiles from that floor on get recomputed.
+
+        :param floor: The floor to change
+        :param angle: The new angle in degrees or as a path data letter
+        """
+        self.load_tiles()
+        self._check_floor(floor, len(self.angle_data))
+        angle = self._to_angle(angle)
+        self.angle_data[floor] = angle
+        self._edited(self.tile_table.set_angle(floor, angle.angle))
+
+    def insert_floor(self, floor: int, angle: Angle | float | str):
+        """
+        Inserts a floor before the given one. The actions and decorations of the following floors move with them.
+        Only the tiles from the new floor on get recomputed.
+
+        :param floor: The index of the new floor. The number of floors appends it.
+        :param angle: The angle of the new floor in degrees or as a path data letter
+        """
+        self.load_tiles()
+        self._check_floor(floor, len(self.angle_data) + 1)
+        angle = self._to_angle(angle)
+        self.angle_data.insert(floor, angle)
+        for grouped in (self.actions, self.tile_actions):
+            _shift_floors(grouped, floor, 1, len(self.angle_data))
+        self.decorations.shift_floors(floor, 1)
+        if self.tile_table is None:
+            self._edited(floor)
+        else:
+            self._edited(self.tile_table.insert_floor(floor, angle.angle, self.actions))
+
+    def delete_floor(self, floor: int):
+        """
+        Removes a floor together with its actions and decorations. The actions and decorations of the following
+        floors move with them. Only the tiles from the removed floor on get recomputed.
+
+        :param floor: The floor to remove
+        """
+        self.load_tiles()
+        self._check_floor(floor, len(self.angle_data))
+        del self.angle_data[floor]
+        for grouped in (self.actions, self.tile_actions):
+            grouped.pop(floor, None)
+            _shift_floors(grouped, floor + 1, -1, len(self.angle_data) + 1)
+        self.decorations.remove_floor(floor)
+        self.decorations.shift_floors(floor + 1, -1)
+        self._edited(self.tile_table.delete_floor(floor, self.actions))
+
+    def add_action(self, action: Actions.Action | dict, floor: int = None):
+        """
+        Adds an action to a floor. Twirls and speed changes recompute the tiles from that floor on.
 
-            if self.angle_data[floor] == 999.0:
-                # short return tiles (the ones with the triangle)
-                tile = Tile(floor=floor, in_angle=self.tile_list[floor - 1].out_angle.opposite,
-                            out_angle=self.tile_list[floor - 1].out_angle.opposite, bpm=cur_bpm,
-                            is_short_return_tile=True,
-                            actions=tile_actions, decorations=tile_decorations, previous_tile=self.tile_list[floor - 1],
-                            offset_x=pos_x, offset_y=pos_y, _reversed=is_reversed,
-                            distance_from_start=distance_from_start, distance_from_start_beats=dis_from_start_beats)
-
-            elif self.angle_data[floor].angle < 0:
-                # long return tiles (the ones with the half circle)
-                tile = Tile(floor=floor, in_angle=self.tile_list[floor - 1].out_angle.opposite,
-                            out_angle=self.angle_data[floor].opposite, bpm=cur_bpm,
-                            is_long_return_tile=True,
-                            actions=tile_actions, decorations=tile_decorations, previous_tile=self.tile_list[floor - 1],
-                            offset_x=pos_x, offset_y=pos_y, _reversed=is_reversed,
-                            distance_from_start=distance_from_start, distance_from_start_beats=dis_from_start_beats)
-
-            else:
-                tile = Tile(floor=floor, in_angle=self.tile_list[floor - 1].out_angle.opposite,
-                            out_angle=self.angle_data[floor],
-                            actions=tile_actions, bpm=cur_bpm, decorations=tile_decorations, _reversed=is_reversed,
-                            offset_x=pos_x, offset_y=pos_y, previous_tile=self.tile_list[floor - 1],
-                            distance_from_start=distance_from_start, distance_from_start_beats=dis_from_start_beats)
-            pos_x += tile.dur_x
-            pos_y += tile.dur_y
-            distance_from_start += tile.duration
-            dis_from_start_beats += tile.duration_in_beats
-            self.tile_list.append(tile)
-        """
-        last_tile = Tile(floor=len(self.angle_data) + 1, in_angle=self.angle_data[-1].opposite,
-                         out_angle=Angle(0.0), bpm=cur_bpm)
-        self.tile_list.append(last_tile)
-        """
-        self.duration = self.tile_list[-1].duration
-        self.duration_in_beats = self.tile_list[-1].duration_in_beats
-        self.pos_x = pos_x
-        self.pos_y = pos_y
+        :param action: The action as an action class or as a dict with an eventType
+        :param floor: The floor to add the action to. Defaults to the floor of the dict.
+        """
+        self.load_tiles()
+        if isinstance(action, Actions.Action):
+            entry = {"eventType": action.event_type}
+            for key, attr in action.fields():
+                if (value := getattr(action, attr)) is not None:
+                    entry[key] = value
+        else:
+            entry = dict(action)
+            action = Actions.load_action(entry)
+            dict_floor = entry.pop("floor", None)
+            floor = dict_floor if floor is None else floor
+        if floor is None:
+            raise AttributeError("No floor given!")
+        self._check_floor(floor, len(self.angle_data))
+
+        self.actions.setdefault(floor, []).append(entry)
+        self.tile_actions.setdefault(floor, {})[action.event_type] = action
+        self._action_edited(floor, action.event_type)
+
+    def remove_action(self, floor: int, event_type: str):
+        """
+        Removes all actions of an event type from a floor. Twirls and speed changes recompute the tiles from that
+        floor on.
 
+        :param floor: The floor to remove the actions from
+        :param event_type: The event type of the actions, e.g. "Twirl"
+        """
+        self.load_tiles()
+        entries = self.actions.get(floor, [])
+        kept = [entry for entry in entries if entry.get("eventType") != event_type]
+        if len(kept) == len(entries):
+            raise AttributeError(f"Floor {floor} has no {event_type} action!")
+
+        if kept:
+            self.actions[floor] = kept
+        else:
+            del self.actions[floor]
+        floor_actions = self.tile_actions.get(floor, {})
+        floor_actions.pop(event_type, None)
+        if not floor_actions:
+            self.tile_actions.pop(floor, None)
+        self._action_edited(floor, event_type)
+
+    @staticmethod
+    def _to_angle(angle: Angle | float | str) -> Angle:
+        if isinstance(angle, Angle):
+            return angle
+        return Angle(descriptor=angle if isinstance(angle, str) else float(angle))
+
+    @staticmethod
+    def _check_floor(floor: int, count: int):
+        if not 0 <= floor < count:
+            raise IndexError("Floor index out of range!")
+
+    def _action_edited(self, floor: int, event_type: str):
+        if event_type in ("Twirl", "SetSpeed") and self.tile_table is not None:
+            self._edited(self.tile_table.recalculate(floor, self.actions))
+        else:
+            self._modified = True
+            self.__dict__.pop("floor_events", None)
+            self.__dict__.pop("tag_index", None)
+            if self.tile_table is not None:
+                self.tile_list.invalidate(floor, floor + 1)
+
+    def _edited(self, floor: int):
+        """Drops everything that was derived from the tiles from floor on"""
+        self._modified = True
+        for index in self._indexes:
+            self.__dict__.pop(index, None)
+        if self.tile_table is None or not len(self.tile_table):
+            # The map had no tiles before or has none now, so the table is built again from the angles
+            self.__dict__.pop("tile_table", None)
+            self.__dict__.pop("tile_list", None)
+            return
+        self.tile_list.invalidate(floor)
+
+    @property
+    def duration(self) -> float:
+        return float(self.tile_table.durations[-1]) if self.tile_table is not None else 0.0
+
+    @property
+    def duration_in_beats(self) -> float:
+        return float(self.tile_table.durations_in_beats[-1]) if self.tile_table is not None else 0.0
 
+    @property
+    def pos_x(self) -> float:
+        return self.tile_table.end_x if self.tile_table is not None else 0.0
+
+    @property
+    def pos_y(self) -> float:
+        return self.tile_table.end_y if self.tile_table is not None else 0.0
 
     """def load_tiles_old(self):
         if not self.angle_data:
@@ -247,20 +606,122 @@ class Map(Savable):
                 distance_from_start_beats=start_dur_beats, decorations=tile_decorations
             ))"""
 
-    def to_midi(self, path: str = None):
+    def save(self, path: str, compact: bool = False):
+        """
+        Writes this map to a .adofai file.
+
+        The path data, settings, actions and decorations are written straight from the data of this map,
+        one action or decoration at a time. Actions and decorations without a floor follow the others,
+        in the order they were read.
+
+        :param path: The path to write the map to. Pass self.path to overwrite the map file.
+        :param compact: Writes the map without indentation and line breaks.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            self._write(f, compact)
+
+    def dumps(self, compact: bool = False) -> str:
         """
-        Converts this map to a midi file
+        Returns this map in the .adofai format.
 
-        :param path: Path to save the midi file to. If not given, the file will be created at the map location
+        :param compact: Returns the map without indentation and line breaks.
+        """
+        f = io.StringIO()
+        self._write(f, compact)
+        return f.getvalue()
+
+    def _write(self, f, compact: bool):
+        encode = (_compact_encoder if compact else _encoder).encode
+        newline, indent, space = ("", "", "") if compact else ("\n", "    ", " ")
+
+        letters = [angle.letter for angle in self.angle_data]
+        if self._path_key == "pathData" and all(letter in Angle.angle_dict for letter in letters):
+            path_key, path_data = "pathData", encode("".join(letters))
+        else:
+            path_key, path_data = "angleData", encode([angle.angle for angle in self.angle_data])
+        f.write(f'{{{newline}{indent}"{path_key}":{space}{path_data},{newline}')
+
+        # Every setting read from the file is written back, even unknown ones and nulls
+        parsed = set(self._setting_keys)
+        keys = SETTING_FIELDS + tuple(key for key in self._setting_keys if key not in SETTING_FIELDS)
+        settings = ((key, getattr(self.settings, key, None)) for key in keys)
+        f.write(f'{indent}"settings":{space}{{{newline}')
+        f.write(f",{newline}".join(
+            f"{indent * 2}{encode(key)}:{space}{encode(value)}" for key, value in settings
+            if value is not None or key in parsed
+        ))
+        f.write(f"{newline}{indent}}},{newline}")
+
+        floorless = (("actions", self.actions, self.floorless_actions),
+                     ("decorations", self.decorations, self.decorations.without_floor()))
+        for name, grouped, without_floor in floorless:
+            f.write(f'{indent}"{name}":{space}[{newline}')
+            separator = ""
+            for floor in sorted(grouped):
+                lines = [f"{indent * 2}{encode({'floor': floor, **entry})}" for entry in grouped[floor]]
+                if lines:
+                    f.write(separator + f",{newline}".join(lines))
+                    separator = f",{newline}"
+            if without_floor:
+                f.write(separator + f",{newline}".join(f"{indent * 2}{encode(dict(entry))}" for entry in without_floor))
+            f.write(f"{newline}{indent}]{',' if name == 'actions' else ''}{newline}")
+        f.write("}" + newline)
+
+    def to_midi(self, path: str | BinaryIO = None, pitch: Mapping = angle_pitch, velocity: Mapping = 100,
+                channel: int = 0, markers: tuple[str, ...] = ("Twirl", "SetSpeed")):
+        """
+        Converts this map to a midi file with a tempo track, a note track and a track of event markers.
+        See adofai.midi.table_to_midi for the parameters and adofai.midi.mapping for the available mappings.
+
+        :param path: Path to save the midi file to, or a binary file object to write it to.
+                     If not given, the file will be created at the map location
+        :param pitch: The note number of all notes, or a mapping returning it for every floor
+        :param velocity: The velocity of all notes, or a mapping returning it for every floor
+        :param channel: The midi channel of the notes
+        :param markers: The event types to write markers for
         """
         if not path:
             path = os.path.join(
-                os.sep.join(self.path.split(os.sep)[:-1]), f"{self.settings.song.replace("\"", "")}.mid")
-        if not os.path.exists(os.sep.join(self.path.split(os.sep)[:-1])):
-            raise FileNotFoundError("The map directory does not exist!")
-        file = open(path, 'wb+')
-        file.close()
-        tiles_to_midi_pretty(self.tile_list[1:], path)
+                os.sep.join(self.path.split(os.sep)[:-1]), f"{self.settings.song.replace(chr(34), '')}.mid")
+            if not os.path.exists(os.sep.join(self.path.split(os.sep)[:-1])):
+                raise FileNotFoundError("The map directory does not exist!")
+        if self.tile_table is None:
+            raise AttributeError("This map has no tiles!")
+        table_to_midi(self.tile_table, path, pitch=pitch, velocity=velocity, channel=channel,
+                      events=self.floor_events, markers=markers)
+
+    def to_wav(self, path: str | BinaryIO = None, sample_rate: int = 44100, volume: float = 1.0,
+               samples: dict[str, np.ndarray] = None):
+        """
+        Renders the hitsounds of this map to a wav file, using the offset, pitch and hitsounds of the map.
+        See adofai.audio.table_to_wav for the parameters.
+
+        :param path: Path to save the wav file to, or a binary file object to write it to.
+                     If not given, the file will be created at the map location
+        :param sample_rate: The sample rate in Hz
+        :param volume: The volume of the whole track
+        :param samples: Float samples to use for hitsounds by name instead of synthesized ones
+        """
+        if not path:
+            path = os.path.join(
+                os.sep.join(self.path.split(os.sep)[:-1]), f"{self.settings.song.replace(chr(34), '')}.wav")
+            if not os.path.exists(os.sep.join(self.path.split(os.sep)[:-1])):
+                raise FileNotFoundError("The map directory does not exist!")
+        if self.tile_table is None:
+            raise AttributeError("This map has no tiles!")
+        offset = getattr(self.settings, "offset", None) or 0
+        pitch = getattr(self.settings, "pitch", None) or 100
+        table_to_wav(self.tile_table, path, events=self.floor_events, sample_rate=sample_rate, offset=float(offset),
+                     pitch=float(pitch), volume=volume, samples=samples)
+
+    def render(self, size: tuple[int, int] = (256, 256), image_format: str = "svg") -> bytes:
+        """
+        Renders a preview of the path of this map without opening a window. See adofai.render.render_table.
+
+        :param size: The width and height of the image in pixels
+        :param image_format: "svg", which needs no other packages, or "png", which needs pygame
+        """
+        return render_map(self, size, image_format)
 
     def plot(self):
         if not PYGAME_FLAG:
@@ -1,8 +1,8 @@
-import math
 import numpy as np
 
 from .classes import Angle, Decoration, Savable
 from .Actions import Action
+from .tempo import beats_to_ms
 
 
 def _angle_from_vecs(vec1: np.array, vec2: np.array):
@@ -42,13 +42,22 @@ def clockwise_angle(angle1_degrees, angle2_degrees):
 
 
 class Tile(Savable):
-    """ """
+    """
+    A single tile of a map.
+
+    Tiles use __slots__, share interned Angle objects and compute in_vec and out_vec only when requested,
+    so a tile takes about 660 bytes. Maps keep their tile data in a TileTable at about 115 bytes per floor
+    and only create Tile objects for the floors that are accessed.
+    """
+    __slots__ = ("floor", "in_angle", "out_angle", "decorations", "actions", "bpm", "is_short_return_tile",
+                 "is_long_return_tile", "relative_angle", "relative_angle_reverse", "reversed",
+                 "distance_from_start_beats", "distance_from_start", "offset_x", "offset_y", "dur_x", "dur_y",
+                 "duration", "duration_in_beats", "_prev_tile", "_tile_list")
+
     floor: int  # Index of the tile
     in_angle: Angle  # input angle of the tile
     out_angle: Angle  # output angle of the tile
-    in_vec: np.array
-    out_vec: np.array
-    decorations: list[Decoration]  # List of decoration objects on this Tile
+    decorations: list[Decoration]  # List of decoration objects on this Tile, DecorationView rows for maps
     actions: list | dict | list[Action]  # Actions associated with this class
     bpm: float  # The current beats per minute of this tile
 
@@ -78,8 +87,6 @@ class Tile(Savable):
         self.floor = floor
         self.in_angle = in_angle
         self.out_angle = out_angle
-        self.in_vec = np.array(self.angle_to_vector(self.in_angle.angle))
-        self.out_vec = np.array(self.angle_to_vector(self.out_angle.angle))
 
         self.is_short_return_tile = is_short_return_tile
         self.is_long_return_tile = is_long_return_tile
@@ -98,6 +105,7 @@ class Tile(Savable):
         self.duration_in_beats = 0.0
         self.duration = 0.0
         self.prev_tile = previous_tile
+        self._tile_list = None
         self.relative_angle = 360.0
         self.relative_angle_reverse = 0.0
 
@@ -107,6 +115,67 @@ class Tile(Savable):
             self.calculate_duration()
         self.calculate_pos_offsets()
 
+    @classmethod
+    def from_table(cls, table, floor: int, actions: dict[str, Action] = None, decorations: list[Decoration] = None,
+                   tile_list=None) -> "Tile":
+        """
+        Creates a tile from the precomputed columns of a TileTable without recalculating any of its values.
+
+        :param table: TileTable: The table containing this tile.
+        :param floor: The index of the tile in the table.
+        :param actions: Actions associated with this tile.
+        :param decorations: Decoration objects on this tile.
+        :param tile_list: The TileList this tile belongs to, used to look up the previous tile.
+        """
+        tile = cls.__new__(cls)
+        tile.floor = floor
+        tile.in_angle = Angle(float(table.in_angles[floor]))
+        tile.out_angle = Angle(float(table.out_angles[floor]))
+
+        tile.is_short_return_tile = bool(table.is_short_return_tile[floor])
+        tile.is_long_return_tile = bool(table.is_long_return_tile[floor])
+
+        tile.actions = actions if actions else []
+        tile.decorations = decorations if decorations else []
+        tile.reversed = bool(table.reversed[floor])
+        tile.bpm = float(table.bpm[floor])
+
+        tile.offset_x = float(table.offsets_x[floor])
+        tile.offset_y = float(table.offsets_y[floor])
+        tile.dur_x = float(table.dur_x[floor])
+        tile.dur_y = float(table.dur_y[floor])
+
+        tile.distance_from_start = float(table.distance_from_start[floor])
+        tile.distance_from_start_beats = float(table.distance_from_start_beats[floor])
+
+        tile.duration_in_beats = float(table.durations_in_beats[floor])
+        tile.duration = float(table.durations[floor])
+        tile.relative_angle = float(table.relative_angles[floor])
+        tile.relative_angle_reverse = float(table.relative_angles_reverse[floor])
+
+        tile._prev_tile = None
+        tile._tile_list = tile_list
+        return tile
+
+    @property
+    def in_vec(self) -> np.array:
+        return self.angle_to_vector(self.in_angle.angle)
+
+    @property
+    def out_vec(self) -> np.array:
+        return self.angle_to_vector(self.out_angle.angle)
+
+    @property
+    def prev_tile(self) -> "Tile":
+        """The tile before this one. Tiles created from a TileTable look it up lazily."""
+        if self._prev_tile is None and self._tile_list is not None and self.floor > 0:
+            return self._tile_list[self.floor - 1]
+        return self._prev_tile
+
+    @prev_tile.setter
+    def prev_tile(self, value: "Tile"):
+        self._prev_tile = value
+
     def __repr__(self):
         return self.save()
 
@@ -121,9 +190,7 @@ class Tile(Savable):
         After calling this method, self.duration_in_beats and self.duration can be accessed safely
         """
         self.duration_in_beats: float = self.relative_angle / np.float64(180.0)
-        self.duration: float = 0.0
-        if self.bpm:
-            self.duration = self.duration_in_beats * (60_000 / self.bpm)
+        self.duration: float = float(beats_to_ms(self.duration_in_beats, self.bpm or 0.0))
 
     @staticmethod
     def angle_to_vector(angle_degrees):
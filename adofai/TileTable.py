@@ -0,0 +1,440 @@
+from collections.abc import Sequence
+
+import numpy as np
+
+from .classes import Decoration
+from .decorations import DecorationStore
+from .Tile import Tile
+from .tempo import TempoMap, apply_speed_changes, beats_to_ms
+
+
+def _opposite(angles: np.ndarray) -> np.ndarray:
+    """Vectorized version of Angle.opposite"""
+    return np.mod(np.abs(angles) + 180, 360)
+
+
+class TileTable:
+    """
+    Columnar representation of all tiles of a map.
+
+    Every field is a NumPy array with one entry per floor. All values are computed in a few vectorized passes
+    instead of one Tile object per floor, and match what Tile would compute for the same floor.
+
+    fields:
+        angles: The raw angle of every floor as given by the angle or path data (999.0 for midspins)
+        in_angles, out_angles: The in- and output angles of every tile
+        relative_angles, relative_angles_reverse: The relative angles of every tile
+        reversed: Whether the rotation on a tile is reversed
+        is_short_return_tile, is_long_return_tile: Return tile flags
+        bpm: The beats per minute of every tile
+        durations, durations_in_beats: The duration of every tile in milliseconds and beats
+        dur_x, dur_y: The amount of units every tile takes up on the x- and y-axis
+        offsets_x, offsets_y: The cumulative position of every tile
+        distance_from_start, distance_from_start_beats: The time position of every tile. Both are sorted,
+            so they double as the index for looking up tiles by time.
+
+    :param angles: The raw angles of all floors.
+    :param base_bpm: The bpm of the map.
+    :param actions: The action dicts of the map, grouped by floor.
+    """
+    columns = ("angles", "in_angles", "out_angles", "relative_angles", "relative_angles_reverse", "reversed",
+               "is_short_return_tile", "is_long_return_tile", "bpm", "durations", "durations_in_beats",
+               "dur_x", "dur_y", "offsets_x", "offsets_y", "distance_from_start", "distance_from_start_beats")
+    bool_columns = ("reversed", "is_short_return_tile", "is_long_return_tile")
+
+    angles: np.ndarray
+    in_angles: np.ndarray
+    out_angles: np.ndarray
+    relative_angles: np.ndarray
+    relative_angles_reverse: np.ndarray
+    reversed: np.ndarray
+    is_short_return_tile: np.ndarray
+    is_long_return_tile: np.ndarray
+    bpm: np.ndarray
+    durations: np.ndarray
+    durations_in_beats: np.ndarray
+    dur_x: np.ndarray
+    dur_y: np.ndarray
+    offsets_x: np.ndarray
+    offsets_y: np.ndarray
+    distance_from_start: np.ndarray
+    distance_from_start_beats: np.ndarray
+
+    # Writable arrays with spare room that the columns are views of, once the table has been edited
+    _buffers: dict[str, np.ndarray] | None = None
+
+    def __init__(self, angles, base_bpm: float, actions: dict[int, list[dict]] = None):
+        self.angles = np.asarray(angles, dtype=np.float64)
+        self.base_bpm = float(base_bpm)
+        self._calculate(0, actions or {})
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray]) -> "TileTable":
+        """
+        Creates a table from already computed columns, e.g. ones loaded from a cache.
+
+        :param columns: All columns of the table by name.
+        """
+        table = cls.__new__(cls)
+        for name in cls.columns:
+            setattr(table, name, columns[name])
+        table.base_bpm = float(table.bpm[0]) if len(table.bpm) else 0.0
+        return table
+
+    def __len__(self):
+        return len(self.angles)
+
+    # Editing
+
+    def set_angle(self, floor: int, angle: float) -> int:
+        """
+        Changes the angle of a floor. Returns the first floor whose values changed.
+
+        Only the tiles whose angles depend on the floor get recomputed. The positions and times of all later tiles
+        are moved by the difference instead of being summed up again.
+
+        :param floor: The floor to change.
+        :param angle: The new raw angle of the floor.
+        """
+        self._reserve(len(self))
+        self.angles[floor] = angle
+        return self._update_angles(floor)
+
+    def insert_floor(self, floor: int, angle: float, actions: dict[int, list[dict]]) -> int:
+        """
+        Inserts a floor before the given one. Returns the first floor whose values changed.
+        The actions have to be grouped by their new floors already.
+
+        :param floor: The index of the new floor.
+        :param angle: The raw angle of the new floor.
+        :param actions: The action dicts of the map, grouped by floor.
+        """
+        n = len(self)
+        self._reserve(n + 1)
+        self._resize(n + 1)
+        if not floor:
+            # Every floor moves, so all of them are computed again
+            self.angles[1:] = self.angles[:-1]
+            self.angles[0] = angle
+            return self._calculate(0, actions)
+
+        for name in self.columns:
+            column = getattr(self, name)
+            column[floor + 1:] = column[floor:-1]
+        # The new floor has no actions, so it keeps the bpm and the rotation of the floor before it
+        self.angles[floor] = angle
+        self.reversed[floor] = self.reversed[floor - 1]
+        self.bpm[floor] = self.bpm[floor - 1]
+        return self._update_angles(floor)
+
+    def delete_floor(self, floor: int, actions: dict[int, list[dict]]) -> int:
+        """
+        Removes a floor. Returns the first floor whose values changed.
+        The actions have to be grouped by their new floors already.
+
+        :param floor: The floor to remove.
+        :param actions: The action dicts of the map, grouped by floor.
+        """
+        n = len(self)
+        self._reserve(n)
+        # Removing a twirl or a speed change affects all following floors
+        changes_following = not floor or (floor < n - 1 and (self.reversed[floor] != self.reversed[floor - 1]
+                                                              or self.bpm[floor] != self.bpm[floor - 1]))
+        columns = ("angles",) if changes_following else self.columns
+        for name in columns:
+            column = getattr(self, name)
+            column[floor:-1] = column[floor + 1:]
+        self._resize(n - 1)
+        if changes_following:
+            return self._calculate(floor, actions)
+        return self._update_angles(floor)
+
+    def recalculate(self, floor: int, actions: dict[int, list[dict]]) -> int:
+        """
+        Recomputes all floors from the given one on, e.g. after a twirl or speed change was added there.
+        Returns the first floor whose values changed.
+
+        :param floor: The first floor to recompute.
+        :param actions: The action dicts of the map, grouped by floor.
+        """
+        self._reserve(len(self))
+        return self._calculate(floor, actions)
+
+    def _reserve(self, size: int):
+        """Moves the columns into writable buffers with room for at least size floors"""
+        if self._buffers is not None and len(self._buffers["angles"]) >= size:
+            return
+        n = len(self)
+        capacity = max(size + size // 8, 16)
+        self._buffers = {}
+        for name in self.columns:
+            column = getattr(self, name)
+            buffer = self._buffers[name] = np.empty(capacity, dtype=column.dtype)
+            buffer[:n] = column
+            setattr(self, name, buffer[:n])
+
+    def _resize(self, size: int):
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:size])
+
+    def _store(self, name: str, start: int, values: np.ndarray):
+        """Sets the values of a column from floor start on"""
+        if self._buffers is None:
+            setattr(self, name, values)
+        else:
+            getattr(self, name)[start:start + len(values)] = values
+
+    # Calculation
+
+    def _calculate(self, start: int, actions: dict[int, list[dict]]) -> int:
+        """
+        Computes all columns from floor start on, continuing from the values before it.
+        Returns the floor the calculation actually started at.
+        """
+        angles = self.angles
+        n = len(angles)
+        start = self._chain_start(start)
+
+        # Only twirls and speed changes affect the tiles, so the actions do not need to be converted to classes.
+        # Like in the game and in FloorEvents, the actions of the first floor count as well.
+        twirls = np.zeros(n - start, dtype=np.int8)
+        speed_changes = {}
+        floors = range(start, n) if n - start < len(actions) else actions
+        for floor in floors:
+            if not start <= floor < n:
+                continue
+            for action in actions.get(floor, ()):
+                event_type = action.get("eventType")
+                if event_type == "Twirl":
+                    twirls[floor - start] = 1
+                elif event_type == "SetSpeed":
+                    speed_changes[floor] = action
+
+        reversed_before = bool(self.reversed[start - 1]) if start else False
+        self._store("reversed", start, (np.cumsum(twirls) % 2).astype(bool) ^ reversed_before)
+        self._store("bpm", start, self._calculate_bpm(start, speed_changes))
+        self._calculate_angles(start, n)
+        self._calculate_durations(start, n)
+        self._calculate_positions(start, n)
+        return start
+
+    def _update_angles(self, floor: int) -> int:
+        """
+        Recomputes the tiles whose angles depend on the angle of floor, assuming the bpm and the rotation are
+        still correct. Returns the first floor whose values changed.
+        """
+        n = len(self)
+        start = self._chain_start(floor)
+        # The next tile and any short return tiles after it take their direction from this floor
+        stop = floor + 1
+        while stop < n and self.angles[stop] == 999.0:
+            stop += 1
+        stop = min(stop + 1, n)
+
+        self._calculate_angles(start, stop)
+        self._calculate_durations(start, stop)
+        self._calculate_positions(start, stop)
+        return start
+
+    def _chain_start(self, floor: int) -> int:
+        """Returns the last regular floor before a run of short return tiles, which they take their direction from"""
+        floor = min(floor, len(self))
+        while 0 < floor < len(self) and self.angles[floor] == 999.0:
+            floor -= 1
+        return floor
+
+    def _calculate_bpm(self, start: int, speed_changes: dict) -> np.ndarray:
+        """Applies the speed changes in floor order and spreads the resulting bpm over the following floors"""
+        start_bpm = float(self.bpm[start - 1]) if start else self.base_bpm
+        change_floors, values = apply_speed_changes(start_bpm, speed_changes)
+
+        bpm = np.full(len(self) - start, start_bpm)
+        if change_floors:
+            segment = np.searchsorted(change_floors, np.arange(start, len(self)), side="right") - 1
+            has_change = segment >= 0
+            bpm[has_change] = np.asarray(values, dtype=np.float64)[segment[has_change]]
+        return bpm
+
+    def _calculate_angles(self, start: int, stop: int):
+        angles = self.angles[start:stop]
+        floors = np.arange(start, stop)
+
+        is_short_return_tile = angles == 999.0
+        is_long_return_tile = angles < 0
+        if not start:
+            is_short_return_tile[:1] = False
+            is_long_return_tile[:1] = False
+        self._store("is_short_return_tile", start, is_short_return_tile)
+        self._store("is_long_return_tile", start, is_long_return_tile)
+
+        # Output angles of all tiles that are not short return tiles
+        out_angles = np.where(is_long_return_tile, _opposite(angles), angles)
+
+        # Short return tiles keep the direction of the last regular tile, flipped once per short return tile
+        base = np.maximum.accumulate(np.where(is_short_return_tile, start, floors))
+        steps = floors - base
+        once = _opposite(out_angles[base - start])
+        twice = _opposite(once)
+        out_angles = np.where(steps == 0, out_angles, np.where(steps % 2 == 1, once, twice))
+        self._store("out_angles", start, out_angles)
+
+        in_angles = np.empty(len(out_angles))
+        in_angles[:1] = _opposite(self.out_angles[start - 1]) if start else 180.0
+        in_angles[1:] = _opposite(out_angles[:-1])
+        self._store("in_angles", start, in_angles)
+
+        reversed_ = self.reversed[start:stop]
+        clockwise = np.mod(np.mod(in_angles, 360) - np.mod(out_angles, 360), 360)
+        counter_clockwise = 360 - np.mod(clockwise, 360)
+        relative_angles = np.where(reversed_, counter_clockwise, clockwise)
+        relative_angles_reverse = np.where(reversed_, clockwise, counter_clockwise)
+        relative_angles[is_long_return_tile] = 360.0
+        relative_angles_reverse[is_long_return_tile] = 0.0
+        self._store("relative_angles", start, relative_angles)
+        self._store("relative_angles_reverse", start, relative_angles_reverse)
+
+    def _calculate_durations(self, start: int, stop: int):
+        durations_in_beats = self.relative_angles[start:stop] / np.float64(180.0)
+        durations_in_beats[self.is_short_return_tile[start:stop]] = 0.0
+        self._store("durations_in_beats", start, durations_in_beats)
+        self._store("durations", start, beats_to_ms(durations_in_beats, self.bpm[start:stop]))
+
+        # The first tile does not count towards the distance from the start
+        self._running_sum("distance_from_start", self.durations, 1, start, stop)
+        self._running_sum("distance_from_start_beats", self.durations_in_beats, 1, start, stop)
+
+    def _calculate_positions(self, start: int, stop: int):
+        radians = np.radians(self.out_angles[start:stop])
+        self._store("dur_x", start, np.cos(radians))
+        self._store("dur_y", start, np.sin(radians))
+        self._running_sum("offsets_x", self.dur_x, 0, start, stop)
+        self._running_sum("offsets_y", self.dur_y, 0, start, stop)
+
+    def _running_sum(self, name: str, steps: np.ndarray, first: int, start: int, stop: int):
+        """
+        Sets column[i] to the sum of steps[first:i] for the floors from start to stop.
+        The sum continues from the value before start, and the values after stop are moved by the difference
+        instead of being summed up again.
+        """
+        values = np.zeros(stop - start)
+        begin = max(start, first + 1)
+        if begin < stop:
+            previous = getattr(self, name)[begin - 1] if begin > first + 1 else 0.0
+            values[begin - start:] = np.cumsum(np.concatenate(([previous], steps[begin - 1:stop - 1])))[1:]
+        self._store(name, start, values)
+
+        if stop < len(steps):
+            column = getattr(self, name)
+            following = column[stop - 1] + steps[stop - 1] if stop > first else 0.0
+            column[stop:] += following - column[stop]
+
+    @staticmethod
+    def _floors_at(starts: np.ndarray, durations: np.ndarray, positions) -> np.ndarray:
+        """Bisects the sorted start positions. Positions before the first or after the last tile give -1."""
+        positions = np.asarray(positions, dtype=np.float64)
+        floors = np.searchsorted(starts, positions, side="right") - 1
+        if not len(starts):
+            return floors
+        return np.where(positions < starts[-1] + durations[-1], floors, -1)
+
+    def floors_at_times(self, times) -> np.ndarray:
+        """
+        Returns the floors that are playing at the given times, or -1 for times outside the map.
+        Tiles without a duration are skipped, since no time falls on them.
+
+        :param times: Times since the start of the map in milliseconds, as a number or an array.
+        """
+        return self._floors_at(self.distance_from_start, self.durations, times)
+
+    def floors_at_beats(self, beats) -> np.ndarray:
+        """
+        Returns the floors that are playing at the given beats, or -1 for beats outside the map.
+
+        :param beats: Beats since the start of the map, as a number or an array.
+        """
+        return self._floors_at(self.distance_from_start_beats, self.durations_in_beats, beats)
+
+    def tempo_map(self) -> TempoMap:
+        """Returns the bpm segments of this table"""
+        return TempoMap.from_table(self)
+
+    @property
+    def total_duration(self) -> float:
+        """The time from the start of the map to the end of the last tile in milliseconds"""
+        return float(self.distance_from_start[-1] + self.durations[-1]) if len(self) else 0.0
+
+    @property
+    def total_duration_in_beats(self) -> float:
+        """The time from the start of the map to the end of the last tile in beats"""
+        return float(self.distance_from_start_beats[-1] + self.durations_in_beats[-1]) if len(self) else 0.0
+
+    @property
+    def end_x(self) -> float:
+        """The x position after the last tile"""
+        return float(self.offsets_x[-1] + self.dur_x[-1]) if len(self) else 0.0
+
+    @property
+    def end_y(self) -> float:
+        """The y position after the last tile"""
+        return float(self.offsets_y[-1] + self.dur_y[-1]) if len(self) else 0.0
+
+
+class TileList(Sequence):
+    """
+    Read-only list of tiles backed by a TileTable.
+
+    Tile objects are only created when indexed and are kept afterwards, so repeated access returns the same object.
+
+    :param table: The TileTable holding the tile values.
+    :param actions: The action classes of the map, grouped by floor.
+    :param decorations: The DecorationStore of the map, or its decoration dicts grouped by floor.
+    """
+
+    def __init__(self, table: TileTable, actions: dict[int, dict] = None,
+                 decorations: DecorationStore | dict[int, list] = None):
+        self.table = table
+        self.actions = actions or {}
+        self.decorations = decorations if decorations is not None else {}
+        self._tiles: dict[int, Tile] = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index: int | slice) -> Tile | list[Tile]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Tile index out of range!")
+
+        tile = self._tiles.get(index)
+        if tile is None:
+            tile = self._tiles[index] = Tile.from_table(
+                self.table, index, actions=self.actions.get(index),
+                decorations=self._decorations(index), tile_list=self
+            )
+        return tile
+
+    def _decorations(self, floor: int) -> list:
+        decorations = self.decorations.get(floor, [])
+        # A DecorationStore already returns dict-like views of its rows
+        if isinstance(self.decorations, DecorationStore):
+            return decorations
+        return [Decoration(d) for d in decorations]
+
+    def invalidate(self, start: int, stop: int = None):
+        """
+        Drops the tile objects of the floors from start to stop, so they get created again from the table.
+        Drops all tiles from start on if stop is not given.
+
+        :param start: The first floor to drop.
+        :param stop: The floor after the last one to drop.
+        """
+        # A floor may just have been removed, so the tile after the current last one is dropped as well
+        stop = len(self) + 1 if stop is None else stop
+        if len(self._tiles) > stop - start:
+            for index in range(start, stop):
+                self._tiles.pop(index, None)
+        else:
+            self._tiles = {index: tile for index, tile in self._tiles.items() if not start <= index < stop}
@@ -0,0 +1,110 @@
+# Renders the hitsounds of a map to a wav file straight from the columns of a TileTable
+
+import wave
+from typing import BinaryIO
+
+import numpy as np
+
+from ..events import FloorEvents
+
+# Length of the synthesized hitsounds in seconds
+HITSOUND_LENGTH = 0.08
+
+# Number of samples mixed and written at once, so long maps never need the whole track in memory
+BLOCK_SIZE = 1 << 20
+
+
+def synthesize_hitsound(name: str, sample_rate: int = 44100) -> np.ndarray:
+    """
+    Synthesizes a short stand-in for a hitsound of the game, as float samples between -1 and 1.
+    Kicks are a falling sine, hats and shakers noise, snares and claps noise over a low tone and
+    everything else a click.
+
+    :param name: The name of the hitsound, e.g. "Kick"
+    :param sample_rate: The sample rate in Hz
+    """
+    t = np.arange(int(sample_rate * HITSOUND_LENGTH)) / sample_rate
+    noise = np.random.default_rng(0).uniform(-1, 1, len(t))
+    if name.startswith("Kick"):
+        # Sweeps from 160 Hz down to 50 Hz
+        phase = 2 * np.pi * (50 * t + 110 / 30 * (1 - np.exp(-30 * t)))
+        return np.sin(phase) * np.exp(-40 * t)
+    if name.startswith(("Hat", "Shaker")):
+        return 0.5 * noise * np.exp(-120 * t)
+    if name.startswith(("Snare", "Clap")):
+        return (0.6 * noise + 0.4 * np.sin(2 * np.pi * 200 * t)) * np.exp(-50 * t)
+    return np.sin(2 * np.pi * 1000 * t) * np.exp(-80 * t)
+
+
+def hit_times(table, offset: float = 0.0, pitch: float = 100.0,
+              first_floor: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the floors that play a hitsound and the times they are hit at in milliseconds.
+    Floors reached without any time passing, e.g. right after a midspin, are hit together with the floor before.
+
+    :param table: TileTable: The tiles of the map
+    :param offset: The offset of the map in milliseconds
+    :param pitch: The pitch of the song in percent. Higher pitches play the map faster.
+    :param first_floor: The first floor that plays a hitsound
+    """
+    floors = np.arange(first_floor, len(table))
+    if len(floors) > 1:
+        floors = floors[np.concatenate(([True], table.durations[floors[1:] - 1] > 0))]
+    return floors, (offset + table.distance_from_start[floors]) * (100 / pitch)
+
+
+def table_to_wav(table, output_file: str | BinaryIO, events: FloorEvents = None, sample_rate: int = 44100,
+                 offset: float = 0.0, pitch: float = 100.0, volume: float = 1.0,
+                 samples: dict[str, np.ndarray] = None, first_floor: int = 1):
+    """
+    Renders a hitsound for every hit of a map to a mono 16 bit wav file.
+
+    The track is mixed in blocks of BLOCK_SIZE samples and every hit is added into its block as one slice,
+    so no python loop runs over single samples. The hitsound and its volume on every floor are taken from
+    the floor events.
+
+    :param table: TileTable: The tiles of the map
+    :param output_file: The path of the wav file, or a binary file object to write to, e.g. io.BytesIO
+    :param events: The floor events of the map for the hitsounds and their volumes. Uses Kick at full volume
+                   on every floor if not given.
+    :param sample_rate: The sample rate in Hz
+    :param offset: The offset of the map in milliseconds, see MapSetting.offset
+    :param pitch: The pitch of the song in percent, see MapSetting.pitch
+    :param volume: The volume of the whole track, where 1 is the volume of a single hit at 100 percent
+    :param samples: Float samples to use for hitsounds by name. Missing hitsounds are synthesized.
+    :param first_floor: The first floor that plays a hitsound
+    """
+    events = events if events is not None else FloorEvents({}, len(table))
+    samples = samples or {}
+    floors, times = hit_times(table, offset, pitch, first_floor)
+    starts = np.round(times * sample_rate / 1000).astype(np.int64)
+    # Hits before the start of the file, e.g. because of a negative offset, are dropped
+    audible = starts >= 0
+    floors, starts = floors[audible], starts[audible]
+    amplitudes = volume * events.hitsound_volumes[floors] / 100
+    kinds = events.hitsounds[floors]
+
+    sounds = [np.asarray(samples[name], dtype=np.float64) if name in samples
+              else synthesize_hitsound(name, sample_rate) for name in events.hitsound_names]
+    longest = max(map(len, sounds))
+    total = int(starts.max(initial=-1)) + 1 + longest
+
+    with wave.open(output_file, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        # Hits ringing past the end of a block are carried over into the next one
+        carry = np.zeros(longest)
+        first = 0
+        for block_start in range(0, total, BLOCK_SIZE):
+            size = min(BLOCK_SIZE, total - block_start)
+            block = np.zeros(size + longest)
+            block[:longest] = carry
+            last = int(np.searchsorted(starts, block_start + size))
+            for start, kind, amplitude in zip((starts[first:last] - block_start).tolist(),
+                                              kinds[first:last].tolist(), amplitudes[first:last].tolist()):
+                sound = sounds[kind]
+                block[start:start + len(sound)] += amplitude * sound
+            first = last
+            carry = block[size:]
+            f.writeframes((np.clip(block[:size], -1, 1) * 32767).astype("<i2").tobytes())
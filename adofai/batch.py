@@ -0,0 +1,155 @@
+# Loading and analyzing many maps at once
+
+import os
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from .Map import Map
+
+
+class MapSummary:
+    """
+    Compact, picklable summary of a map.
+
+    If the map could not be loaded, error contains the reason and all other fields keep their defaults.
+
+    fields:
+        path: The path to the map file
+        error: The exception raised while loading the map, as a string
+        song, artist, author: From the map settings
+        tile_count: The number of tiles
+        duration: The time to the end of the last tile in milliseconds
+        duration_in_beats: The time to the end of the last tile in beats
+        bpm_min, bpm_max: The lowest and highest bpm of any tile
+        bpm_average: The average bpm over the duration of the map
+        event_counts: The number of actions per event type
+        decoration_count: The number of decorations
+    """
+    __slots__ = ("path", "error", "song", "artist", "author", "tile_count", "duration", "duration_in_beats",
+                 "bpm_min", "bpm_max", "bpm_average", "event_counts", "decoration_count")
+
+    def __init__(self, path: str, error: str = None):
+        self.path = path
+        self.error = error
+        self.song = ""
+        self.artist = ""
+        self.author = ""
+        self.tile_count = 0
+        self.duration = 0.0
+        self.duration_in_beats = 0.0
+        self.bpm_min = 0.0
+        self.bpm_max = 0.0
+        self.bpm_average = 0.0
+        self.event_counts: dict[str, int] = {}
+        self.decoration_count = 0
+
+    def __repr__(self):
+        if self.error:
+            return f"MapSummary({self.path!r}, error={self.error!r})"
+        return f"MapSummary({self.path!r}, tiles={self.tile_count}, duration={self.duration:.0f}ms)"
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+def summarize(path: str) -> MapSummary:
+    """
+    Loads a map and summarizes it. Exceptions are caught and stored in the summary.
+
+    Only the tile table and the grouped actions are built, the actions are not converted to classes.
+
+    :param path: The path to the map file
+    """
+    try:
+        level = Map(path, lazy=True)
+        summary = MapSummary(level.path)
+        summary.song = level.settings.song
+        summary.artist = level.settings.artist
+        summary.author = level.settings.author
+        summary.event_counts = dict(Counter(
+            action.get("eventType") for floor_actions in level.actions.values() for action in floor_actions
+        ))
+        summary.decoration_count = level.decoration_count
+
+        table = level.tile_table
+        if table is not None:
+            summary.tile_count = len(table)
+            summary.duration = table.total_duration
+            summary.duration_in_beats = table.total_duration_in_beats
+            summary.bpm_min = float(np.min(table.bpm))
+            summary.bpm_max = float(np.max(table.bpm))
+            if summary.duration:
+                summary.bpm_average = summary.duration_in_beats / (summary.duration / 60_000)
+        return summary
+    except Exception as e:
+        return MapSummary(os.path.abspath(path), error=f"{type(e).__name__}: {e}")
+
+
+class MapBatch:
+    """
+    Summarizes many maps across a pool of worker processes.
+
+    Iterating a batch yields one MapSummary per path, in the order of the paths, as soon as it is ready.
+    A map that fails to load does not stop the batch, its summary contains the error instead.
+
+    functions:
+        chunks: Yields the summaries in lists of a given size
+        run: Returns all summaries as a list
+
+    :param paths: The paths to the map files.
+    :param workers: The number of worker processes. Maps are processed in this process if 0.
+                    Defaults to the number of CPUs.
+    :param chunk_size: The number of paths sent to a worker at once.
+    """
+
+    def __init__(self, paths: Iterable[str], workers: int = None, chunk_size: int = 8):
+        self.paths = list(paths)
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self) -> Iterator[MapSummary]:
+        if self.workers == 0:
+            yield from map(summarize, self.paths)
+            return
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            yield from executor.map(summarize, self.paths, chunksize=self.chunk_size)
+        finally:
+            # All paths are submitted up front, so leaving early cancels the ones not started yet
+            # instead of waiting for the whole batch
+            executor.shutdown(cancel_futures=True)
+
+    def chunks(self, size: int = 64) -> Iterator[list[MapSummary]]:
+        """
+        Yields the summaries in lists of the given size, so results can be processed while the batch is running.
+
+        :param size: The number of summaries per list
+        """
+        summaries = iter(self)
+        while chunk := list(islice(summaries, size)):
+            yield chunk
+
+    def run(self) -> list[MapSummary]:
+        return list(self)
+
+
+def load_many(paths: Iterable[str], workers: int = None, chunk_size: int = 8) -> list[MapSummary]:
+    """
+    Summarizes many maps in parallel.
+
+    :param paths: The paths to the map files
+    :param workers: The number of worker processes, see MapBatch
+    :param chunk_size: The number of paths sent to a worker at once
+    """
+    return MapBatch(paths, workers=workers, chunk_size=chunk_size).run()
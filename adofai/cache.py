@@ -0,0 +1,154 @@
+# On-disk cache for computed tile tables
+
+import glob
+import hashlib
+import os
+from functools import cache
+
+import numpy as np
+
+from .TileTable import TileTable
+
+DEFAULT_CACHE_DIR = os.environ.get("ADOFAI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "adofai"))
+
+
+@cache
+def _code_version() -> str:
+    """
+    Hashes the source of the modules of this package. Entries are keyed by it, so a new version of the code
+    computing the cached columns never reads the entries of an older one.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class MapCache:
+    """
+    Caches the TileTable of map files on disk.
+
+    Entries are keyed by the hash of the map file content and the code version, so neither edited maps nor changed
+    code ever hit a stale entry. A cache that can not be read or written behaves like an empty one.
+    Every entry is a single .npy file holding all tile columns, which gets memory mapped when it is read.
+    When the cache grows beyond max_bytes, the least recently used entries are removed.
+
+    functions:
+        key: Returns the cache key of a map file
+        get: Returns a cached TileTable or None
+        put: Stores a TileTable
+        clear: Removes all entries
+
+    :param directory: The directory to store the entries in.
+    :param max_bytes: The maximum size of all entries together.
+    """
+
+    suffix = ".npy"
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(path: str) -> str:
+        """
+        Hashes the content of a map file together with the code version.
+
+        :param path: The path to the map file
+        """
+        digest = hashlib.sha256(f"adofai-tiles-{_code_version()}".encode())
+        with open(path, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _entries(self) -> list[tuple[str, os.stat_result]]:
+        """Returns the path and the stat of every entry. Entries removed in the meantime are left out."""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(self.suffix)]
+        except OSError:
+            return []
+        result = []
+        for entry in entries:
+            try:
+                result.append((entry.path, entry.stat()))
+            except OSError:
+                pass
+        return result
+
+    def get(self, key: str) -> TileTable | None:
+        """
+        Memory maps a cached TileTable. The columns of the returned table are read-only.
+
+        :param key: The cache key of the map file
+        """
+        path = self._entry_path(key)
+        try:
+            matrix = np.load(path, mmap_mode="r")
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if matrix.ndim != 2 or matrix.shape[1] != len(TileTable.columns):
+            return None
+        columns = {name: matrix[:, i] for i, name in enumerate(TileTable.columns)}
+        for name in TileTable.bool_columns:
+            columns[name] = columns[name] != 0
+        return TileTable.from_columns(columns)
+
+    def put(self, key: str, table: TileTable):
+        """
+        Stores a TileTable and evicts the least recently used entries if the cache is too large.
+        Does nothing if the cache directory can not be written.
+
+        :param key: The cache key of the map file
+        :param table: The TileTable to store
+        """
+        matrix = np.empty((len(table), len(TileTable.columns)), order="F")
+        for i, name in enumerate(TileTable.columns):
+            matrix[:, i] = getattr(table, name)
+
+        path = self._entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                np.save(f, matrix)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits into max_bytes."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            total -= stat.st_size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        for path, _ in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @property
+    def size(self) -> int:
+        """The size of all entries together in bytes"""
+        return sum(stat.st_size for _, stat in self._entries())
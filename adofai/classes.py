@@ -45,13 +45,14 @@ def exclude_key_from_dict(_input: dict, key: object) -> dict:
     return {k: value for k, value in _input.items() if k != key}
 
 
-def group_dicts_by_key(_dict: list[dict], key: str | int) -> dict:
+def group_dicts_by_key(_dict: list[dict], key: str | int, missing: list = None) -> dict:
     """Helper function for grouping dictionaries by key.
 
-    If a dictionary does not have the key specified, it will not be returned.
+    If a dictionary does not have the key specified, it will not be returned, but added to missing if given.
 
     :param _dict: list[dict]: list of dictionaries to group
     :param key: str | int | object: the key to be grouped
+    :param missing: list: collects the dictionaries without the key, unchanged and in their order
     :returns: the grouped dictionaries by key as a list of dictionaries
 
     """
@@ -59,9 +60,12 @@ def group_dicts_by_key(_dict: list[dict], key: str | int) -> dict:
     for dictionary in _dict:
         if not isinstance(dictionary, dict):
             continue
-        _key = dictionary.pop(key, None)
-        if not _key:
+        _key = dictionary.get(key)
+        if _key is None:
+            if missing is not None:
+                missing.append(dictionary)
             continue
+        del dictionary[key]
         if not result.get(_key, None):
             result[_key] = []
         result[_key].append(dictionary)
@@ -78,6 +82,8 @@ class Savable:
         save
     """
 
+    __slots__ = ()
+
     def load(self, load_obj: str | dict):
         """
         Loads all arguments from a dictionary or json object.
@@ -111,6 +117,14 @@ class Savable:
 
 
 class Angle:
+    """
+    An angle of the path, given either as a path data letter or as a float.
+
+    Angles of path data letters and the floats they stand for are interned, so creating the same angle twice
+    returns the same object. Angles are shared this way and must not be modified.
+    """
+    __slots__ = ("dynamic", "angle", "letter", "radians", "_opposite")
+
     dynamic: bool
     angle: float
     letter: str
@@ -148,8 +162,19 @@ class Angle:
                         '8': 360,
                         "!": 999
                         }
+    # Reverse lookup table of angle_dict
+    letter_dict: dict = {value: key for key, value in angle_dict.items()}
 
-    def __init__(self, descriptor: str | float, dynamic: bool = False):
+    # Interned angles by (descriptor type, descriptor, dynamic)
+    _interned: dict = {}
+
+    def __new__(cls, descriptor: str | float, dynamic: bool = False):
+        key = (type(descriptor), descriptor, dynamic)
+        self = cls._interned.get(key)
+        if self is not None:
+            return self
+
+        self = super().__new__(cls)
         if isinstance(descriptor, float):
             self.angle = descriptor
             self.letter = self.convert_angle_to_letter(descriptor)
@@ -159,6 +184,17 @@ class Angle:
 
         self.dynamic = dynamic
         self.radians = math.radians(self.angle)
+        self._opposite = None
+
+        # Only letters and the angles they stand for are interned, arbitrary float angles are not.
+        # A letter and its float share one instance.
+        if self.angle in cls.letter_dict:
+            cls._interned.setdefault((str, self.letter, dynamic), self)
+            cls._interned.setdefault((float, self.angle, dynamic), self)
+        return self
+
+    def __reduce__(self):
+        return Angle, (self.angle, self.dynamic)
 
     def __repr__(self):
         return str(self.angle)
@@ -185,7 +221,9 @@ class Angle:
 
     @property
     def opposite(self) -> 'Angle':
-        return Angle((abs(self.angle) + 180) % 360)
+        if self._opposite is None:
+            self._opposite = Angle((abs(self.angle) + 180) % 360)
+        return self._opposite
 
     @staticmethod
     def convert_letter_to_angle(letter: str) -> float:
@@ -193,7 +231,7 @@ class Angle:
 
     @staticmethod
     def convert_angle_to_letter(angle: float) -> str:
-        return {value: key for key, value in Angle.angle_dict.items()}.get(angle, str(angle))
+        return Angle.letter_dict.get(angle, str(angle))
 
 
 class Decoration(UserDict):
@@ -472,6 +510,8 @@ class MapSetting(Savable):
         self.customClass = customClass
         self.startCamLowVFX = startCamLowVFX
 
+        # The bound arguments include self, which would make every MapSetting refer to itself
+        _kwargs.pop("self", None)
         for key in _kwargs.keys():
             if not _kwargs[key]:
                 self._defaults_dict[key] = _kwargs[key]
@@ -0,0 +1,391 @@
+# Columnar storage for the decorations of a map
+
+from collections.abc import Iterable, Iterator, Mapping, MutableMapping
+
+import numpy as np
+
+# Keys held in typed columns. Values of other types, e.g. null, stay python objects like all other keys.
+NUMBER_KEYS = ("depth", "rotation")
+PAIR_KEYS = ("position", "scale")
+STRING_KEYS = {"tag": "tags", "decorationImage": "images"}
+
+# Larger integers do not fit into a float column without losing digits
+_MAX_EXACT_INT = 2 ** 53
+
+# Floors of rows that are not on a floor: removed decorations, and decorations the map gives no floor,
+# e.g. ones placed relative to the camera
+REMOVED = -1
+NO_FLOOR = -2
+
+
+def _is_number(value) -> bool:
+    return type(value) is float or type(value) is int and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT
+
+
+class DecorationView(MutableMapping):
+    """
+    A single decoration of a DecorationStore, behaving like the dict of the decoration without holding one.
+    Values are read from and written to the columns of the store.
+
+    :param store: The store holding the decoration.
+    :param row: The row of the decoration in the store.
+    """
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "DecorationStore", row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key: str):
+        return self.store.get_value(self.row, key)
+
+    def __setitem__(self, key: str, value):
+        self.store.set_value(self.row, key, value)
+
+    def __delitem__(self, key: str):
+        self.store.delete_value(self.row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.keys_of(self.row))
+
+    def __len__(self):
+        return len(self.store.keys_of(self.row))
+
+    def __repr__(self):
+        return f"DecorationView({self.store.to_dict(self.row)!r})"
+
+    @property
+    def floor(self) -> int | None:
+        floor = int(self.store.floors[self.row])
+        return None if floor == NO_FLOOR else floor
+
+
+class DecorationStore(Mapping):
+    """
+    The decorations of a map in columns instead of one dict per decoration.
+
+    The keys every decoration has are kept once per distinct set of keys. Tags, images, depths, positions, scales and
+    rotations are held in typed columns, all other values as python objects, with equal strings and lists shared
+    between decorations.
+
+    Like the grouped decoration dicts it replaces, the store maps every floor with decorations to a list of them,
+    as DecorationView rows that can be used like dicts. len() therefore counts floors, size counts decorations.
+
+    fields:
+        floors: The floor of every decoration, REMOVED for removed ones and NO_FLOOR for ones without a floor
+        depth, rotation: The depth and rotation of every decoration, NaN if it has none
+        position, scale: The position and scale of every decoration as (x, y) rows, NaN if it has none
+        tags, images: The index into tag_names and image_names of the tag and image of every decoration, -1 if none
+        tag_names, image_names: list[str]: All tags and images used by the decorations
+        single_tags: list[str]: The single tags of all decorations, with tags separated by spaces split up
+
+    functions:
+        on_floor: Returns the rows of the decorations on a floor
+        without_floor: Returns the decorations without a floor
+        with_tag: Returns the rows of the decorations with a tag
+        view, to_dict: Returns a decoration as DecorationView or as dict
+        shift_floors, remove_floor: Moves the decorations along when floors are inserted or removed
+
+    :param decorations: The decoration dicts, e.g. of a map file. Entries that are no dicts are left out,
+                        entries without a floor are kept with all their keys.
+    :param key: The key holding the floor of a decoration.
+    """
+    floors: np.ndarray
+    depth: np.ndarray
+    rotation: np.ndarray
+    position: np.ndarray
+    scale: np.ndarray
+    tags: np.ndarray
+    images: np.ndarray
+
+    def __init__(self, decorations: Iterable[dict] = (), key: str = "floor"):
+        decorations = [decoration for decoration in decorations if isinstance(decoration, dict)]
+        count = len(decorations)
+        floors = [decoration.get(key) for decoration in decorations]
+        self.floors = np.fromiter((NO_FLOOR if floor is None else floor for floor in floors), dtype=np.int64,
+                                  count=count)
+
+        # The floor is usually the first key. Decorations without a floor keep all of their keys.
+        schemas = [keys if floor is None else keys[1:] if keys[0] == key
+                   else tuple(name for name in keys if name != key)
+                   for keys, floor in zip(map(tuple, decorations), floors)]
+        self._schema_ids: dict[tuple[str, ...], int] = {}
+        self._schema = np.array([self._schema_ids.setdefault(keys, len(self._schema_ids)) for keys in schemas],
+                                dtype=np.int32).reshape(count)
+        self._schemas: list[tuple[str, ...]] = list(self._schema_ids)
+
+        self._strings: dict[str, str] = {}
+        self._lists: dict[tuple, tuple] = {}
+        self._values: dict[str, list] = {}
+        self._codes: dict[str, dict[str, int]] = {name: {} for name in STRING_KEYS}
+        self._names: dict[str, list[str]] = {name: [] for name in STRING_KEYS}
+        self._ints: dict[str, np.ndarray] = {}
+        self._typed: dict[str, np.ndarray] = {}
+
+        # Every key is read column by column, missing keys read as None and are told apart by the schema
+        for name in dict.fromkeys(name for keys in self._schemas for name in keys):
+            values = [decoration.get(name) for decoration in decorations]
+            if name in NUMBER_KEYS:
+                typed = self._read_numbers(name, values, values)
+            elif name in PAIR_KEYS:
+                pairs = [value if type(value) is list and len(value) == 2 else (None, None) for value in values]
+                typed = self._read_numbers(name, [x for x, _ in pairs], [y for _, y in pairs])
+            elif name in STRING_KEYS:
+                codes = self._codes[name]
+                column = np.array([codes.setdefault(value, len(codes)) if type(value) is str else -1
+                                   for value in values], dtype=np.int32).reshape(count)
+                self._names[name].extend(codes)
+                setattr(self, STRING_KEYS[name], column)
+                typed = self._typed[name] = column >= 0
+            else:
+                typed = np.zeros(count, dtype=bool)
+            if not typed.all():
+                share = self._share
+                self._values[name] = [None if is_typed else share(value)
+                                      for value, is_typed in zip(values, typed.tolist())]
+
+        # Keys no decoration has yet still get their empty columns
+        for name in NUMBER_KEYS + PAIR_KEYS:
+            if name not in self._typed:
+                self._read_numbers(name, [None] * count, [None] * count)
+        for name, column in STRING_KEYS.items():
+            if name not in self._typed:
+                setattr(self, column, np.full(count, -1, dtype=np.int32))
+                self._typed[name] = np.zeros(count, dtype=bool)
+
+        self._floor_index: tuple[np.ndarray, np.ndarray] | None = None
+        self._tag_index: dict[str, np.ndarray] | None = None
+
+    def _read_numbers(self, name: str, xs: list, ys: list) -> np.ndarray:
+        """
+        Fills the typed column of a number or pair key. Returns where the values fit into it,
+        all other values are kept as python objects.
+        """
+        columns, ints = [], []
+        for values in (xs, ys) if name in PAIR_KEYS else (xs,):
+            types = list(map(type, values))
+            is_int = np.array([kind is int for kind in types], dtype=bool)
+            is_float = np.array([kind is float for kind in types], dtype=bool)
+            column = np.array([value if kind is int or kind is float else np.nan for value, kind in zip(values, types)],
+                              dtype=np.float64)
+            # Larger integers do not survive the float column
+            is_int &= np.abs(column) <= _MAX_EXACT_INT
+            columns.append(np.where(is_int | is_float, column, np.nan))
+            ints.append(is_int)
+        typed = np.logical_and.reduce([~np.isnan(column) for column in columns])
+        if name in PAIR_KEYS:
+            setattr(self, name, np.stack(columns, axis=1).reshape(len(xs), 2))
+            self._ints[name] = np.stack(ints, axis=1).reshape(len(xs), 2)
+        else:
+            setattr(self, name, columns[0])
+            self._ints[name] = ints[0]
+        self._typed[name] = typed
+        return typed
+
+    @property
+    def tag_names(self) -> list[str]:
+        return self._names["tag"]
+
+    @property
+    def image_names(self) -> list[str]:
+        return self._names["decorationImage"]
+
+    def _code(self, key: str, name: str) -> int:
+        codes = self._codes[key]
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+            self._names[key].append(name)
+        return code
+
+    def _schema_id(self, keys: tuple[str, ...]) -> int:
+        schema = self._schema_ids.get(keys)
+        if schema is None:
+            schema = self._schema_ids[keys] = len(self._schemas)
+            self._schemas.append(keys)
+        return schema
+
+    def _value_column(self, key: str) -> list:
+        column = self._values.get(key)
+        if column is None:
+            column = self._values[key] = [None] * len(self.floors)
+        return column
+
+    def _share(self, value):
+        """Returns an equal value already held by the store, if there is one. Lists are held as tuples."""
+        if type(value) is str:
+            return self._strings.setdefault(value, value)
+        if type(value) is list:
+            try:
+                shared_key = (tuple(value), tuple(map(type, value)))
+                return self._lists.setdefault(shared_key, shared_key)[0]
+            except TypeError:
+                return value
+        return value
+
+    # Mapping of floors to their decorations
+
+    def __getitem__(self, floor: int) -> list[DecorationView]:
+        rows = self.on_floor(floor)
+        if not len(rows):
+            raise KeyError(floor)
+        return [DecorationView(self, row) for row in rows.tolist()]
+
+    def __iter__(self) -> Iterator[int]:
+        keys, _ = self._index_by_floor()
+        return iter(np.unique(keys).tolist())
+
+    def __len__(self):
+        keys, _ = self._index_by_floor()
+        return len(np.unique(keys))
+
+    def __contains__(self, floor) -> bool:
+        return bool(len(self.on_floor(floor)))
+
+    @property
+    def size(self) -> int:
+        """The number of decorations, including the ones without a floor"""
+        return int(np.count_nonzero(self.floors != REMOVED))
+
+    # Indexes
+
+    def _index_by_floor(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the sorted floors of all decorations and their rows"""
+        if self._floor_index is None:
+            rows = np.flatnonzero(self.floors >= 0)
+            order = rows[np.argsort(self.floors[rows], kind="stable")]
+            self._floor_index = (self.floors[order], order)
+        return self._floor_index
+
+    def on_floor(self, floor: int) -> np.ndarray:
+        """
+        Returns the rows of all decorations on a floor, in the order they were added.
+
+        :param floor: The floor
+        """
+        keys, rows = self._index_by_floor()
+        return rows[np.searchsorted(keys, floor, side="left"):np.searchsorted(keys, floor, side="right")]
+
+    def _index_by_tag(self) -> dict[str, np.ndarray]:
+        """Returns the sorted rows of the decorations with every single tag"""
+        if self._tag_index is None:
+            codes = {}
+            for code, name in enumerate(self.tag_names):
+                for single in name.split():
+                    codes.setdefault(single, []).append(code)
+            alive = self.tags >= 0
+            alive &= self.floors != REMOVED
+            rows = np.flatnonzero(alive)
+            order = rows[np.argsort(self.tags[rows], kind="stable")]
+            starts = np.searchsorted(self.tags[order], np.arange(len(self.tag_names) + 1))
+            index = {
+                single: np.sort(np.concatenate([order[starts[code]:starts[code + 1]] for code in tag_codes]))
+                for single, tag_codes in codes.items()
+            }
+            # Tags only left on removed or retagged decorations are dropped
+            self._tag_index = {single: rows for single, rows in index.items() if len(rows)}
+        return self._tag_index
+
+    @property
+    def single_tags(self) -> list[str]:
+        return list(self._index_by_tag())
+
+    def without_floor(self) -> list[DecorationView]:
+        """Returns the decorations without a floor, in the order they were added"""
+        return [DecorationView(self, row) for row in np.flatnonzero(self.floors == NO_FLOOR).tolist()]
+
+    def with_tag(self, tag: str) -> np.ndarray:
+        """
+        Returns the sorted rows of all decorations with a tag. A decoration can have several tags separated by spaces.
+
+        :param tag: A single tag
+        """
+        return self._index_by_tag().get(tag, np.empty(0, dtype=np.int64))
+
+    # Rows
+
+    def view(self, row: int) -> DecorationView:
+        """Returns a dict-like view of the decoration in a row"""
+        return DecorationView(self, row)
+
+    def keys_of(self, row: int) -> tuple[str, ...]:
+        """Returns the keys of the decoration in a row, in their original order"""
+        return self._schemas[self._schema[row]]
+
+    def get_value(self, row: int, key: str):
+        """Returns a value of the decoration in a row. Raises a KeyError if the decoration does not have the key."""
+        if key not in self.keys_of(row):
+            raise KeyError(key)
+        typed = self._typed.get(key)
+        if typed is None or not typed[row]:
+            value = self._values[key][row]
+            return list(value) if type(value) is tuple else value
+        if key in STRING_KEYS:
+            return self._names[key][getattr(self, STRING_KEYS[key])[row]]
+        values, ints = getattr(self, key)[row], self._ints[key][row]
+        if key in PAIR_KEYS:
+            return [int(value) if is_int else float(value) for value, is_int in zip(values.tolist(), ints.tolist())]
+        return int(values) if ints else float(values)
+
+    def set_value(self, row: int, key: str, value):
+        """Sets a value of the decoration in a row, adding the key if the decoration does not have it yet"""
+        keys = self.keys_of(row)
+        if key not in keys:
+            self._schema[row] = self._schema_id(keys + (key,))
+        typed = self._typed.get(key)
+        if key in NUMBER_KEYS and _is_number(value):
+            getattr(self, key)[row] = value
+            self._ints[key][row] = type(value) is int
+        elif key in PAIR_KEYS and type(value) is list and len(value) == 2 and all(map(_is_number, value)):
+            getattr(self, key)[row] = value
+            self._ints[key][row] = [type(value[0]) is int, type(value[1]) is int]
+        elif key in STRING_KEYS and type(value) is str:
+            getattr(self, STRING_KEYS[key])[row] = self._code(key, value)
+        else:
+            self._value_column(key)[row] = self._share(value)
+            if typed is not None:
+                typed[row] = False
+            if key == "tag":
+                self.tags[row] = -1
+                self._tag_index = None
+            return
+        typed[row] = True
+        if key == "tag":
+            self._tag_index = None
+
+    def delete_value(self, row: int, key: str):
+        """Removes a key from the decoration in a row"""
+        keys = self.keys_of(row)
+        if key not in keys:
+            raise KeyError(key)
+        self._schema[row] = self._schema_id(tuple(name for name in keys if name != key))
+        if key == "tag":
+            self.tags[row] = -1
+            self._typed[key][row] = False
+            self._tag_index = None
+
+    def to_dict(self, row: int) -> dict:
+        """Returns the decoration in a row as a new dict, without its floor"""
+        return {key: self.get_value(row, key) for key in self.keys_of(row)}
+
+    # Floor edits
+
+    def shift_floors(self, floor: int, by: int):
+        """
+        Moves all decorations from floor on by the given number of floors.
+
+        :param floor: The first floor to move
+        :param by: The number of floors to move them by
+        """
+        self.floors[self.floors >= floor] += by
+        self._floor_index = None
+
+    def remove_floor(self, floor: int):
+        """
+        Removes all decorations on a floor. Their rows stay, so views of other decorations keep pointing to them.
+
+        :param floor: The floor to remove the decorations of
+        """
+        self.floors[self.floors == floor] = REMOVED
+        self._floor_index = None
+        self._tag_index = None
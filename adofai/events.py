@@ -0,0 +1,81 @@
+# Per-floor arrays derived from the actions of a map
+
+import numpy as np
+
+
+class FloorEvents:
+    """
+    Arrays with one entry per floor describing the actions on every floor, for vectorized exporters.
+
+    fields:
+        hitsound_names: list[str]: All hitsounds used in the map. The default hitsound comes first.
+        hitsounds: The index into hitsound_names of the hitsound played on every floor
+        hitsound_volumes: The hitsound volume on every floor in percent
+
+    functions:
+        flags: Returns which floors have an action of an event type
+        from_map: Builds the floor events of a Map
+
+    :param actions: The action dicts of a map, grouped by floor.
+    :param floors: The number of floors.
+    :param hitsound: The hitsound set in the settings of the map.
+    :param hitsound_volume: The hitsound volume set in the settings of the map.
+    """
+
+    def __init__(self, actions: dict[int, list[dict]], floors: int, hitsound: str = "Kick",
+                 hitsound_volume: float = 100):
+        self.actions = actions
+        self.floors = floors
+        self._flags: dict[str, np.ndarray] = {}
+
+        # SetHitsound changes the hitsound and its volume from its floor on. Only the tile hitsound is played,
+        # other game sounds like the midspin sound are left out. Floors with several changes keep their order.
+        changes = sorted((
+            (floor, action) for floor, floor_actions in actions.items() if 0 <= floor < floors
+            for action in floor_actions
+            if action.get("eventType") == "SetHitsound" and action.get("gameSound", "Hitsound") == "Hitsound"
+        ), key=lambda change: change[0])
+        self.hitsound_names = [hitsound]
+        name_indices = {hitsound: 0}
+        change_floors, names, volumes = [], [], []
+        cur_name, cur_volume = hitsound, hitsound_volume
+        for floor, action in changes:
+            cur_name = action.get("hitsound") or cur_name
+            if action.get("hitsoundVolume") is not None:
+                cur_volume = action.get("hitsoundVolume")
+            if cur_name not in name_indices:
+                name_indices[cur_name] = len(self.hitsound_names)
+                self.hitsound_names.append(cur_name)
+            change_floors.append(floor)
+            names.append(name_indices[cur_name])
+            volumes.append(cur_volume)
+
+        segment = np.searchsorted(change_floors, np.arange(floors), side="right") - 1
+        self.hitsounds = np.asarray([0] + names, dtype=np.int64)[segment + 1]
+        self.hitsound_volumes = np.asarray([hitsound_volume] + volumes, dtype=np.float64)[segment + 1]
+
+    @classmethod
+    def from_map(cls, level) -> "FloorEvents":
+        """
+        Builds the floor events of a Map.
+
+        :param level: Map: The map to build the floor events of.
+        """
+        settings = level.settings
+        hitsound = getattr(settings, "hitsound", None) or "Kick"
+        hitsound_volume = getattr(settings, "hitsoundVolume", None)
+        return cls(level.actions, len(level.angle_data), hitsound, 100 if hitsound_volume is None else hitsound_volume)
+
+    def flags(self, event_type: str) -> np.ndarray:
+        """
+        Returns which floors have at least one action of an event type.
+
+        :param event_type: The event type, e.g. "Twirl"
+        """
+        flags = self._flags.get(event_type)
+        if flags is None:
+            flags = self._flags[event_type] = np.zeros(self.floors, dtype=bool)
+            for floor, floor_actions in self.actions.items():
+                if 0 <= floor < self.floors and any(action.get("eventType") == event_type for action in floor_actions):
+                    flags[floor] = True
+        return flags
@@ -1,15 +1,13 @@
 from mido import MidiFile, MidiTrack, Message, second2tick, bpm2tempo, MetaMessage
 import pretty_midi
 
+from .mapping import angle_to_pitch
+
 
 # Function to map tile angles to MIDI note pitches
-def angle_to_midi_note_angle(angle):
-    return 72
-    # Normalize angle to 0-360 range
-    angle.angle %= 360
-    # Map angles to MIDI notes (assuming a range from 60 (C4) to 72 (C5))
-    note = 60 + int(angle.angle / 360 * 12)
-    return note
+def angle_to_midi_note_angle(angle: float) -> int:
+    # Map relative angles from 0 to 360 degrees to MIDI notes from 60 (C4) to 72 (C5)
+    return int(angle_to_pitch(angle))
 
 
 # Function to convert tiles to a MIDI file using pretty_midi
@@ -22,7 +20,6 @@ def tiles_to_midi_pretty(tiles, output_file: str):
     piano = pretty_midi.Instrument(program=piano_program)
 
     for tile in tiles:
-        print("New Tile: Distance from start>{}".format(tile.distance_from_start))
         note_number = angle_to_midi_note_angle(tile.relative_angle)
         start_time = tile.distance_from_start/1000
         end_time = start_time + (tile.duration / 1000)
@@ -57,7 +54,7 @@ def tiles_to_midi(tiles, output_file):
 
     for tile in tiles:
 
-        note = angle_to_midi_note_angle(tile.angle)
+        note = angle_to_midi_note_angle(tile.relative_angle)
         duration_in_ticks = int(second2tick(tile.duration / 1000, mid.ticks_per_beat, tempo))
 
         # Add note on message
@@ -0,0 +1,68 @@
+# Pitch and velocity mappings for the midi export
+#
+# A mapping gets the TileTable and the FloorEvents of a map and returns one value per floor.
+# All values are looked up in precomputed arrays instead of being converted tile by tile.
+
+import numpy as np
+
+# One octave from C4 to C5 over the relative angles from 0 to 360 degrees, indexed by whole degrees
+ANGLE_PITCHES = (60 + np.arange(361) * 12 // 360).astype(np.uint8)
+
+# General midi percussion notes for the hitsounds of the game, to be played on channel 9
+HITSOUND_NOTES = {
+    "Kick": 36,
+    "KickHouse": 36,
+    "KickChroma": 35,
+    "Sidestick": 37,
+    "Snare": 38,
+    "SnareHouse": 40,
+    "Clap": 39,
+    "ClapHit": 39,
+    "Hat": 42,
+    "HatHouse": 46,
+    "Shaker": 70,
+    "Hammer": 56,
+    "Chuck": 76,
+}
+DEFAULT_HITSOUND_NOTE = 37
+
+# Velocities by floor flags, indexed by twirl | speed change << 1 | short return << 2 | long return << 3
+FLAG_VELOCITIES = np.full(16, 100, dtype=np.uint8)
+FLAG_VELOCITIES[0b0001] = 120
+FLAG_VELOCITIES[0b0010] = 110
+FLAG_VELOCITIES[0b0011] = 127
+FLAG_VELOCITIES[0b0100:0b1000] = 70
+FLAG_VELOCITIES[0b1000:] = 85
+
+
+def angle_to_pitch(angles) -> np.ndarray:
+    """
+    Maps relative angles in degrees to pitches.
+
+    :param angles: The relative angles, as a number or an array
+    """
+    return ANGLE_PITCHES[np.clip(np.rint(angles), 0, 360).astype(np.int64)]
+
+
+def angle_pitch(table, events) -> np.ndarray:
+    """Pitches by the relative angle of every tile, so sharper turns play lower notes"""
+    return angle_to_pitch(table.relative_angles)
+
+
+def hitsound_pitch(table, events) -> np.ndarray:
+    """Percussion notes by the hitsound on every floor"""
+    notes = np.asarray([HITSOUND_NOTES.get(name, DEFAULT_HITSOUND_NOTE) for name in events.hitsound_names],
+                       dtype=np.uint8)
+    return notes[events.hitsounds]
+
+
+def flag_velocity(table, events) -> np.ndarray:
+    """Velocities by the twirls, speed changes and return tiles on every floor, see FLAG_VELOCITIES"""
+    flags = (events.flags("Twirl"), events.flags("SetSpeed"), table.is_short_return_tile, table.is_long_return_tile)
+    index = sum(flag.astype(np.int64) << bit for bit, flag in enumerate(flags))
+    return FLAG_VELOCITIES[index]
+
+
+def hitsound_velocity(table, events) -> np.ndarray:
+    """Velocities by the hitsound volume on every floor"""
+    return np.clip(np.rint(events.hitsound_volumes * 127 / 100), 0, 127).astype(np.uint8)
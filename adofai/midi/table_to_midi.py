@@ -0,0 +1,148 @@
+# Fast midi export straight from the columns of a TileTable, without per-note python objects
+
+from collections.abc import Callable
+from typing import BinaryIO
+
+import numpy as np
+
+from ..events import FloorEvents
+from ..tempo import TempoMap
+from .mapping import angle_pitch
+
+# A fixed value or a function returning one value per floor from a TileTable and its FloorEvents
+Mapping = int | Callable[..., np.ndarray]
+
+# Order of note events on the same tick: notes are ended before new ones start
+_NOTE_OFF, _NOTE_ON = 0, 1
+
+
+def _encode_events(ticks: np.ndarray, payloads: np.ndarray, lengths: np.ndarray) -> bytes:
+    """
+    Encodes sorted events as the body of a midi track.
+
+    :param ticks: The absolute time of every event in ticks, in ascending order
+    :param payloads: The bytes of every event without its delta time, one row per event
+    :param lengths: The number of bytes used in every row of payloads
+    """
+    deltas = np.diff(ticks, prepend=0).astype(np.int64)
+    # Delta times are variable length quantities with 7 bits per byte, the highest byte first
+    delta_lengths = 1 + (deltas >= 1 << 7) + (deltas >= 1 << 14) + (deltas >= 1 << 21)
+    sizes = delta_lengths + lengths
+    offsets = np.cumsum(sizes) - sizes
+    data = np.zeros(int(sizes.sum()), dtype=np.uint8)
+
+    for byte in range(4):
+        has_byte = delta_lengths > byte
+        shift = 7 * (delta_lengths[has_byte] - 1 - byte)
+        more = np.where(byte < delta_lengths[has_byte] - 1, 0x80, 0)
+        data[offsets[has_byte] + byte] = (deltas[has_byte] >> shift) & 0x7F | more
+
+    for column in range(payloads.shape[1]):
+        has_column = lengths > column
+        data[offsets[has_column] + delta_lengths[has_column] + column] = payloads[has_column, column]
+    return data.tobytes()
+
+
+def _tempo_events(tempo_map: TempoMap, ticks_per_beat: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the ticks, set_tempo payloads and payload lengths of all tempo changes"""
+    playable = tempo_map.bpm > 0
+    ticks = np.round(tempo_map.beats[playable] * ticks_per_beat).astype(np.int64)
+    # The tempo is given in microseconds per beat as 24 bit number
+    tempos = np.clip(np.round(60_000_000 / tempo_map.bpm[playable]), 1, 0xFFFFFF).astype(np.int64)
+    payloads = np.zeros((len(ticks), 6), dtype=np.uint8)
+    payloads[:, 0], payloads[:, 1], payloads[:, 2] = 0xFF, 0x51, 0x03
+    payloads[:, 3] = tempos >> 16
+    payloads[:, 4] = (tempos >> 8) & 0xFF
+    payloads[:, 5] = tempos & 0xFF
+    return ticks, payloads, np.full(len(ticks), 6)
+
+
+def _marker_events(events: FloorEvents, markers: tuple[str, ...], starts: np.ndarray,
+                   ticks_per_beat: int) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the ticks and marker payloads of all floors with one of the marked event types"""
+    texts = [event_type.encode("ascii", "replace")[:127] for event_type in markers]
+    width = 3 + max(map(len, texts), default=0)
+    ticks, payloads = [np.empty(0, dtype=np.int64)], [np.empty((0, width), dtype=np.uint8)]
+    for event_type, text in zip(markers, texts):
+        floors = np.flatnonzero(events.flags(event_type))
+        ticks.append(np.round(starts[floors] * ticks_per_beat).astype(np.int64))
+        row = np.zeros(width, dtype=np.uint8)
+        row[:3 + len(text)] = (0xFF, 0x06, len(text), *text)
+        payloads.append(np.broadcast_to(row, (len(floors), width)))
+    return np.concatenate(ticks), np.concatenate(payloads)
+
+
+def _resolve(mapping: Mapping, table, events: FloorEvents) -> np.ndarray:
+    """Returns the values of a mapping for every floor"""
+    if callable(mapping):
+        return np.asarray(mapping(table, events), dtype=np.int64)
+    return np.full(len(table), mapping, dtype=np.int64)
+
+
+def _track(ticks: np.ndarray, payloads: np.ndarray, lengths: np.ndarray, kinds: np.ndarray = None) -> bytes:
+    order = np.lexsort((kinds, ticks)) if kinds is not None else np.argsort(ticks, kind="stable")
+    data = _encode_events(ticks[order], payloads[order], lengths[order]) + b"\x00\xff\x2f\x00"
+    return b"MTrk" + len(data).to_bytes(4, "big") + data
+
+
+def table_to_midi(table, output_file: str | BinaryIO, ticks_per_beat: int = 480, pitch: Mapping = angle_pitch,
+                  velocity: Mapping = 100, channel: int = 0, first_floor: int = 1, events: FloorEvents = None,
+                  markers: tuple[str, ...] = ("Twirl", "SetSpeed")):
+    """
+    Writes a note for every tile of a TileTable to a multi-track midi file.
+
+    The first track holds a tempo change for every speed change, the second one the notes and the third one a
+    marker for every floor with one of the marked event types. Tick positions are derived from the positions of
+    the tiles in beats, so the notes stay on the beat grid no matter how often the tempo changes.
+    Tiles without a duration, e.g. midspins, get no note.
+
+    Pitches and velocities are either a fixed value or a mapping from adofai.midi.mapping, which gets the table
+    and the floor events and returns one value per floor.
+
+    :param table: TileTable: The tiles to convert
+    :param output_file: The path of the midi file, or a binary file object to write to, e.g. io.BytesIO
+    :param ticks_per_beat: The resolution of the midi file
+    :param pitch: The midi note number of the notes, or a mapping returning it for every floor
+    :param velocity: The velocity of the notes, or a mapping returning it for every floor
+    :param channel: The midi channel of the notes. Use 9 for percussion, e.g. with hitsound_pitch.
+    :param first_floor: The first floor to write a note for. The first tile is not played by default.
+    :param events: The floor events of the map, needed for markers and for mappings using actions
+    :param markers: The event types to write markers for. Markers are only written if events are given.
+    """
+    events = events if events is not None else FloorEvents({}, len(table))
+    pitches = np.clip(_resolve(pitch, table, events), 0, 127)[first_floor:]
+    velocities = np.clip(_resolve(velocity, table, events), 0, 127)[first_floor:]
+
+    starts = table.distance_from_start_beats[first_floor:]
+    ends = starts + table.durations_in_beats[first_floor:]
+    start_ticks = np.round(starts * ticks_per_beat).astype(np.int64)
+    end_ticks = np.round(ends * ticks_per_beat).astype(np.int64)
+    played = end_ticks > start_ticks
+    start_ticks, end_ticks = start_ticks[played], end_ticks[played]
+    pitches, velocities = pitches[played], velocities[played]
+    notes = len(start_ticks)
+
+    note_payloads = np.zeros((2 * notes, 3), dtype=np.uint8)
+    note_payloads[:notes, 0] = 0x90 | channel
+    note_payloads[notes:, 0] = 0x80 | channel
+    note_payloads[:notes, 1] = note_payloads[notes:, 1] = pitches
+    note_payloads[:notes, 2] = velocities
+    kinds = np.concatenate((np.full(notes, _NOTE_ON), np.full(notes, _NOTE_OFF)))
+    tracks = [
+        _track(*_tempo_events(TempoMap.from_table(table), ticks_per_beat)),
+        _track(np.concatenate((start_ticks, end_ticks)), note_payloads, np.full(2 * notes, 3), kinds),
+    ]
+    if events.actions and markers:
+        marker_ticks, marker_payloads = _marker_events(events, markers, table.distance_from_start_beats,
+                                                       ticks_per_beat)
+        tracks.append(_track(marker_ticks, marker_payloads, 3 + marker_payloads[:, 2].astype(np.int64)))
+
+    header = b"MThd" + (6).to_bytes(4, "big") + (1).to_bytes(2, "big") + len(tracks).to_bytes(2, "big") \
+        + ticks_per_beat.to_bytes(2, "big")
+    data = header + b"".join(tracks)
+
+    if isinstance(output_file, str):
+        with open(output_file, "wb") as f:
+            f.write(data)
+    else:
+        output_file.write(data)
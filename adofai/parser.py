@@ -0,0 +1,269 @@
+# Incremental reader for .adofai files
+
+import json
+import re
+import sys
+from collections.abc import Iterator
+
+# Top level keys whose arrays get emitted element by element
+STREAMED_KEYS = ("actions", "decorations")
+# Top level keys needed to build the tiles of a map without its actions and decorations
+HEADER_KEYS = ("pathData", "angleData", "settings")
+
+_WHITESPACE = re.compile(r"\s*")
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+_decoder = json.JSONDecoder()
+
+
+# Not used by the parser anymore, kept for code importing it from adofai.Map
+def remove_trailing_commas(json_string):
+    # Regular expression to find trailing commas
+    json_string = re.sub(r',\s*([]}])', r'\1', json_string)
+    return json_string
+
+
+class MapParser:
+    """
+    Streaming parser for the json dialect of .adofai files.
+
+    The file is read in chunks and only the value currently being parsed is kept in memory.
+    Trailing commas are accepted without a separate pass over the whole file.
+
+    The entries of arrays and objects are decoded by json as many at a time as the buffer holds, so the entries of a
+    batch share their object keys like with json.loads. Only entries json rejects, e.g. for a trailing comma inside
+    of them, get read one at a time.
+
+    Iterating the parser yields (key, value) pairs for every top level entry of the map. The arrays under
+    STREAMED_KEYS (actions and decorations) are emitted one (key, element) pair per element instead.
+    Iteration can be stopped at any time, e.g. as soon as the settings have been read.
+
+    :param path: The path to the map file.
+    :param chunk_size: The number of characters to read from the file at once.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1 << 16):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._file = None
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        # Where json rejected the last batch, so later batches stop before it without trying again
+        self._rejected = -1
+
+    def __iter__(self) -> Iterator[tuple[str, object]]:
+        with open(self.path, 'r', encoding="utf-8-sig") as self._file:
+            self._buffer = ""
+            self._pos = 0
+            self._eof = False
+            self._rejected = -1
+            yield from self._parse_map()
+
+    def _error(self, message: str):
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def _fill(self) -> bool:
+        """Reads the next chunk into the buffer. Returns False if the end of the file is reached."""
+        if self._eof:
+            return False
+        # Grow the read size with the buffer so that large values are not copied once per chunk
+        chunk = self._file.read(max(self.chunk_size, len(self._buffer) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def _peek(self) -> str:
+        """Skips whitespace and returns the next character without consuming it, or an empty string at the end"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise self._error(f"Expected '{char}'")
+        self._pos += 1
+
+    def _value_end(self, start: int) -> int:
+        """Finds the end of the string or scalar starting at start, reading more of the file if needed."""
+        char = self._buffer[start]
+        if char == '"':
+            pos = start + 1
+            while (match := _STRING_END.match(self._buffer, pos)) is None:
+                if not self._fill():
+                    raise self._error("Unterminated string")
+            return match.end()
+        while (match := _SCALAR_END.search(self._buffer, start)) is None:
+            if not self._fill():
+                return len(self._buffer)
+        return match.start()
+
+    def _drop_parsed(self):
+        """Drops everything that has already been parsed from the buffer"""
+        if self._pos > self.chunk_size:
+            self._buffer = self._buffer[self._pos:]
+            self._rejected -= self._pos
+            self._pos = 0
+
+    def _parse_value(self):
+        self._drop_parsed()
+        char = self._peek()
+        if not char:
+            raise self._error("Expected a value")
+        # Containers are read entry by entry, so a comma right before their end is skipped like any other
+        if char == "{":
+            return self._parse_object()
+        if char == "[":
+            return list(self._parse_array())
+        # Fast path: the value is complete in the buffer and is valid json
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+            # A number cut off by the end of the buffer, e.g. "8." of "8.5", would be read as a shorter number
+            if self._eof or end < len(self._buffer) and (char == '"' or _SCALAR_END.match(self._buffer, end)):
+                self._pos = end
+                return value
+        except json.JSONDecodeError:
+            pass
+        end = self._value_end(self._pos)
+        value = json.loads(self._buffer[self._pos:end])
+        self._pos = end
+        return value
+
+    def _parse_object(self) -> dict:
+        self._pos += 1
+        value = {}
+        while self._peek() != "}":
+            if not self._peek():
+                raise self._error("Unterminated object")
+            entries = self._decode_batch("{}")
+            if entries:
+                value.update(entries)
+                continue
+            key = self._parse_value()
+            if not isinstance(key, str):
+                raise self._error("Expected a key")
+            self._expect(":")
+            value[sys.intern(key)] = self._parse_value()
+            self._skip_comma("}")
+        self._pos += 1
+        return value
+
+    def _parse_array(self) -> Iterator:
+        """Yields the elements of the array starting at the current position"""
+        self._pos += 1
+        while self._peek() != "]":
+            if not self._peek():
+                raise self._error("Unterminated array")
+            elements = self._decode_batch("[]")
+            if elements:
+                yield from elements
+            else:
+                yield self._parse_value()
+                self._skip_comma("]")
+        self._pos += 1
+
+    def _decode_batch(self, brackets: str) -> list | dict:
+        """
+        Decodes the entries of an array or object from the current position up to the last comma in the buffer
+        at once, by letting json decode them as an array or object of their own.
+        If json rejects them, the entries before the first rejected one are decoded instead.
+        Returns an empty array or object if the first entry has to be read on its own.
+
+        :param brackets: The opening and closing bracket of the container, "[]" or "{}"
+        """
+        self._drop_parsed()
+        if len(self._buffer) - self._pos < self.chunk_size:
+            self._fill()
+        buffer, start = self._buffer, self._pos
+        # Entries usually start alike, so a comma followed by the start of the first entry separates two of them.
+        # The greedy match finds the last of them before a limit, and never the start of the first entry.
+        last_separator = re.compile(rf"(?s:.*)(,)\s*{re.escape(buffer[start])}")
+        limit = min(len(buffer), start + self.chunk_size)
+        if self._rejected >= start:
+            limit = min(limit, self._rejected + 1)
+        while (match := last_separator.match(buffer, start + 1, limit)) is not None:
+            cut = match.start(1)
+            text = brackets[0] + buffer[start:cut] + brackets[1]
+            try:
+                entries, end = _decoder.raw_decode(text)
+            except json.JSONDecodeError as error:
+                # Go on with the entries before the rejected one. The decoded text starts one character before start.
+                self._rejected = start + error.pos - 1
+                limit = min(cut, self._rejected + 1)
+                continue
+            # The container ended before the cut, e.g. at a comma between later top level entries
+            self._pos = start + end - 2 if end < len(text) else cut + 1
+            return entries
+        return {} if brackets == "{}" else []
+
+    def _skip_comma(self, closing: str):
+        """Skips the comma after an entry. Only the last entry before the closing bracket may go without one."""
+        char = self._peek()
+        if char == ",":
+            self._pos += 1
+        elif char != closing:
+            raise self._error(f"Expected ',' or '{closing}'")
+
+    def _parse_map(self) -> Iterator[tuple[str, object]]:
+        self._expect("{")
+        while self._peek() != "}":
+            if not self._peek():
+                raise self._error("Unexpected end of file")
+            key = self._parse_value()
+            if not isinstance(key, str):
+                raise self._error("Expected a key")
+            self._expect(":")
+            if key in STREAMED_KEYS and self._peek() == "[":
+                for element in self._parse_array():
+                    yield key, element
+            else:
+                yield key, self._parse_value()
+            self._skip_comma("}")
+
+
+def read_map_data(path: str, keys: tuple[str, ...] = None) -> dict:
+    """
+    Reads a map file into a dictionary.
+
+    If keys are given, reading stops as soon as all of them have been found,
+    so only the part of the file up to the last of them gets parsed.
+
+    :param path: str: The path to the map file
+    :param keys: tuple[str, ...]: The top level keys to read. Reads the full map if not given
+    """
+    data = {}
+    missing = set(keys) if keys else None
+    for key, value in MapParser(path):
+        if missing is not None and key not in keys:
+            if not missing:
+                break
+            continue
+        if key in STREAMED_KEYS:
+            data.setdefault(key, []).append(value)
+        else:
+            data[key] = value
+        if missing is not None:
+            missing.discard(key)
+            if not missing and key not in STREAMED_KEYS:
+                break
+    return data
+
+
+def read_map_header(path: str) -> dict:
+    """
+    Reads the path data and the settings of a map file.
+    Reading stops as soon as both have been found, which is before the actions and decorations in editor files.
+
+    :param path: str: The path to the map file
+    """
+    data = {}
+    for key, value in MapParser(path):
+        if key in HEADER_KEYS:
+            data[key] = value
+            if "settings" in data and ("pathData" in data or "angleData" in data):
+                break
+    return data
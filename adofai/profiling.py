@@ -0,0 +1,98 @@
+# Timing and memory instrumentation for loading maps
+
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import contextmanager, nullcontext
+
+# Returned instead of a stage when instrumentation is off
+NO_STAGE = nullcontext()
+
+
+class StageStats:
+    """
+    Measurements of a single stage of loading a map.
+
+    fields:
+        name: The name of the stage
+        duration: The time the stage took in seconds, summed over all runs
+        peak_memory: The highest memory allocated by Python during the stage in bytes, if memory is traced
+        runs: How often the stage ran
+    """
+    __slots__ = ("name", "duration", "peak_memory", "runs")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.duration = 0.0
+        self.peak_memory = None
+        self.runs = 0
+
+    def __repr__(self):
+        memory = f", peak_memory={self.peak_memory}" if self.peak_memory is not None else ""
+        return f"StageStats({self.name!r}, duration={self.duration * 1000:.2f}ms{memory})"
+
+    def to_dict(self) -> dict:
+        return {"duration": self.duration, "peak_memory": self.peak_memory, "runs": self.runs}
+
+
+class LoadStats:
+    """
+    Collects per-stage durations, counts and peak allocations while a map is loaded.
+
+    Pass an instance (or True) as the profile parameter of Map to enable it. The stages are:
+    parse, angles, settings, parse_body (lazy and cached maps only), group_actions, group_decorations, cache_lookup
+    (with a cache only), tile_table, action_classes, tile_list and spatial_index (on first query). Stages of lazy maps
+    are recorded when they are first accessed.
+
+    fields:
+        stages: dict[str, StageStats]: The measurements of every stage that ran
+        counts: dict[str, int]: The number of events, decorations and tiles
+
+    :param trace_memory: Measures the peak allocation of every stage with tracemalloc. This slows loading down.
+    :param callback: Gets called with the StageStats of a stage every time it finishes.
+    """
+
+    def __init__(self, trace_memory: bool = False, callback: Callable[[StageStats], None] = None):
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.stages: dict[str, StageStats] = {}
+        self.counts: dict[str, int] = {}
+
+    def __repr__(self):
+        return f"LoadStats(total={self.total * 1000:.2f}ms, stages={list(self.stages.values())}, counts={self.counts})"
+
+    @property
+    def total(self) -> float:
+        """The summed duration of all stages in seconds"""
+        return sum(stats.duration for stats in self.stages.values())
+
+    @contextmanager
+    def stage(self, name: str):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(name)
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.duration += time.perf_counter() - start
+            stats.runs += 1
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                stats.peak_memory = max(peak, stats.peak_memory or 0)
+                if started_tracing:
+                    tracemalloc.stop()
+            if self.callback:
+                self.callback(stats)
+
+    def to_dict(self) -> dict:
+        return {"stages": {name: stats.to_dict() for name, stats in self.stages.items()}, "counts": dict(self.counts)}
@@ -0,0 +1,163 @@
+# Headless rendering of map previews straight from the columns of a TileTable, without opening a window
+
+import io
+
+import numpy as np
+
+from . import Drawer
+from .events import FloorEvents
+
+# Tile colors indexed by twirl | speed change << 1, the same colors the viewer uses
+TILE_COLORS = (Drawer.TILE_COLOR, Drawer.TWIRL_TILE_COLOR, Drawer.SPEED_CHANGE_COLOR, (255, 255, 255))
+
+# Positions are snapped to this fraction of a pixel, so segments and tiles that land on the same spot are drawn once
+SUBPIXELS = 2
+
+IMAGE_FORMATS = ("svg", "png")
+
+
+def _fit(xs: np.ndarray, ys: np.ndarray, width: int, height: int,
+         padding: int) -> tuple[np.ndarray, np.ndarray, float]:
+    """
+    Scales and centers positions to fit the image and flips them, so that y points down.
+    Returns the snapped pixel positions in subpixels and the size of one tile unit in pixels.
+    """
+    min_x, max_x, min_y, max_y = xs.min(), xs.max(), ys.min(), ys.max()
+    # Spans below one tile would blow single tiles up to the size of the image
+    scale = min((width - 2 * padding) / max(max_x - min_x, 1.0), (height - 2 * padding) / max(max_y - min_y, 1.0))
+    scale = max(scale, 0.0)
+    pixels_x = (xs - (min_x + max_x) / 2) * scale + width / 2
+    pixels_y = height / 2 - (ys - (min_y + max_y) / 2) * scale
+    return np.rint(pixels_x * SUBPIXELS).astype(np.int64), np.rint(pixels_y * SUBPIXELS).astype(np.int64), scale
+
+
+def _unique_rows(rows: np.ndarray) -> np.ndarray:
+    """Returns the distinct rows of an integer array, sorted. Rows are packed into single keys when they fit."""
+    if not len(rows):
+        return rows
+    low = rows.min(axis=0)
+    spans = (rows.max(axis=0) - low + 1).tolist()
+    if np.prod(spans, dtype=object) >= 1 << 63:
+        return np.unique(rows, axis=0)
+    _, first = np.unique(np.ravel_multi_index((rows - low).T, spans), return_index=True)
+    return rows[first]
+
+
+def _segments(pixels_x: np.ndarray, pixels_y: np.ndarray) -> np.ndarray:
+    """
+    Returns the visible path segments as rows of (x0, y0, x1, y1, color), without duplicates.
+    Segments shorter than a subpixel are left out, the tiles at their ends cover them.
+    """
+    rows = np.stack((pixels_x[:-1], pixels_y[:-1], pixels_x[1:], pixels_y[1:],
+                     np.arange(len(pixels_x) - 1) % len(Drawer.ARROW_COLORS)), axis=1)
+    rows = rows[(rows[:, 0] != rows[:, 2]) | (rows[:, 1] != rows[:, 3])]
+    # Previews have no arrowheads, so a segment and its reverse look the same
+    flip = (rows[:, 0] > rows[:, 2]) | ((rows[:, 0] == rows[:, 2]) & (rows[:, 1] > rows[:, 3]))
+    rows[flip] = rows[flip][:, [2, 3, 0, 1, 4]]
+    return _unique_rows(rows)
+
+
+def _tiles(pixels_x: np.ndarray, pixels_y: np.ndarray, events: FloorEvents) -> np.ndarray:
+    """Returns the tiles as rows of (x, y, color), without duplicates"""
+    colors = events.flags("Twirl").astype(np.int64) | events.flags("SetSpeed").astype(np.int64) << 1
+    return _unique_rows(np.stack((pixels_x, pixels_y, colors), axis=1))
+
+
+def _svg(width: int, height: int, segments: np.ndarray, tiles: np.ndarray, tile_size: float,
+         line_width: float) -> bytes:
+    def color(rgb):
+        return f"rgb({rgb[0]},{rgb[1]},{rgb[2]})"
+
+    def numbers(values):
+        return np.char.mod("%g", values / SUBPIXELS).tolist()
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'viewBox="0 0 {width} {height}">',
+             f'<rect width="{width}" height="{height}" fill="{color(Drawer.BG_COLOR)}"/>']
+    for index, rgb in Drawer.ARROW_COLORS.items():
+        rows = segments[segments[:, 4] == index]
+        if len(rows):
+            path = "".join(f"M{x0} {y0}L{x1} {y1}" for x0, y0, x1, y1 in numbers(rows[:, :4]))
+            parts.append(f'<path fill="none" stroke="{color(rgb)}" stroke-width="{line_width:g}" d="{path}"/>')
+    half = tile_size * SUBPIXELS / 2
+    for index, rgb in enumerate(TILE_COLORS):
+        rows = tiles[tiles[:, 2] == index]
+        if len(rows):
+            path = "".join(f"M{x} {y}h{tile_size:g}v{tile_size:g}h{-tile_size:g}z"
+                           for x, y in numbers(rows[:, :2] - half))
+            parts.append(f'<path fill="{color(rgb)}" d="{path}"/>')
+    parts.append("</svg>")
+    return "\n".join(parts).encode()
+
+
+def _png(width: int, height: int, segments: np.ndarray, tiles: np.ndarray, tile_size: float,
+         line_width: float) -> bytes:
+    pygame = Drawer.pygame
+    # A plain surface needs neither pygame.init nor a display
+    surface = pygame.Surface((width, height))
+    surface.fill(Drawer.BG_COLOR)
+    thickness = max(1, round(line_width))
+    for x0, y0, x1, y1, index in (segments / [SUBPIXELS, SUBPIXELS, SUBPIXELS, SUBPIXELS, 1]).tolist():
+        pygame.draw.line(surface, Drawer.ARROW_COLORS[int(index)], (x0, y0), (x1, y1), thickness)
+    size = max(1, round(tile_size))
+    for x, y, index in tiles.tolist():
+        surface.fill(TILE_COLORS[index], (round(x / SUBPIXELS - size / 2), round(y / SUBPIXELS - size / 2), size, size))
+    buffer = io.BytesIO()
+    pygame.image.save(surface, buffer, "preview.png")
+    return buffer.getvalue()
+
+
+def render_table(table, size: tuple[int, int] = (256, 256), image_format: str = "svg", events: FloorEvents = None,
+                 padding: int = 8, tile_size: float = None, line_width: float = 1.0) -> bytes:
+    """
+    Renders a preview of the path of a TileTable and returns the image file as bytes.
+
+    The whole path is fitted into the image in one pass over the position columns. Tiles and path segments that
+    land on the same spot of the image are drawn once, so the size of the image and not the length of the map
+    bounds the drawing work. Tiles with twirls and speed changes are colored like in the viewer.
+
+    :param table: TileTable: The tiles to render
+    :param size: The width and height of the image in pixels
+    :param image_format: "svg", which needs no other packages, or "png", which needs pygame
+    :param events: The floor events of the map, needed to color twirls and speed changes
+    :param padding: The space between the path and the edges of the image in pixels
+    :param tile_size: The width of a tile in pixels. By default half the distance between two tiles,
+                      but at least one and at most Drawer.TILE_SIZE pixels.
+    :param line_width: The width of the path in pixels
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise AttributeError(f"Unknown image format {image_format!r}, use one of {', '.join(IMAGE_FORMATS)}!")
+    if image_format == "png" and not Drawer.PYGAME_FLAG:
+        raise ImportError("You need to install pygame to render png images!")
+    width, height = int(size[0]), int(size[1])
+    if width <= 0 or height <= 0:
+        raise AttributeError("The image size has to be positive!")
+    if not len(table):
+        raise AttributeError("There are no tiles to render!")
+    events = events if events is not None else FloorEvents({}, len(table))
+
+    pixels_x, pixels_y, scale = _fit(table.offsets_x, table.offsets_y, width, height, padding)
+    if tile_size is None:
+        tile_size = float(np.clip(scale / 2, 1, Drawer.TILE_SIZE))
+    segments = _segments(pixels_x, pixels_y)
+    tiles = _tiles(pixels_x, pixels_y, events)
+    draw = _svg if image_format == "svg" else _png
+    return draw(width, height, segments, tiles, tile_size, line_width)
+
+
+def render_map(level, size: tuple[int, int] = (256, 256), image_format: str = "svg", padding: int = 8,
+               tile_size: float = None, line_width: float = 1.0) -> bytes:
+    """
+    Renders a preview of a map and returns the image file as bytes. See render_table for details.
+
+    :param level: Map: The map to render
+    :param size: The width and height of the image in pixels
+    :param image_format: "svg", which needs no other packages, or "png", which needs pygame
+    :param padding: The space between the path and the edges of the image in pixels
+    :param tile_size: The width of a tile in pixels
+    :param line_width: The width of the path in pixels
+    """
+    if level.tile_table is None:
+        raise AttributeError("This map has no tiles!")
+    return render_table(level.tile_table, size, image_format, events=level.floor_events, padding=padding,
+                        tile_size=tile_size, line_width=line_width)
@@ -0,0 +1,154 @@
+# Uniform grid over tile positions for hit-testing and viewport queries
+
+import numpy as np
+
+
+class SpatialIndex:
+    """
+    Uniform grid over a set of points, e.g. the offsets of all tiles of a map.
+
+    Every point is assigned to a square cell, and the points are sorted by cell so that each column of cells is a
+    contiguous run of the sorted keys. A rectangle query therefore costs one binary search per column of cells
+    it covers instead of a pass over all points.
+
+    Tiles are one unit apart, so the default cell size puts about one tile in every occupied cell.
+
+    functions:
+        tiles_in_rect: Returns the indices of all points inside a rectangle
+        nearest_tile: Returns the index of the point closest to a position
+        overlapping_tiles: Returns all pairs of points closer to each other than a radius
+
+    :param xs: The x positions of the points.
+    :param ys: The y positions of the points.
+    :param cell_size: The width and height of a grid cell.
+    """
+
+    def __init__(self, xs, ys, cell_size: float = 1.0):
+        if cell_size <= 0:
+            raise AttributeError("The cell size has to be positive!")
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        self.cell_size = float(cell_size)
+
+        cells_x, cells_y = self._cells(self.xs, self.ys, self.cell_size)
+        if len(self):
+            self._min_x, self._max_x = int(cells_x.min()), int(cells_x.max())
+            self._min_y, self._max_y = int(cells_y.min()), int(cells_y.max())
+        else:
+            self._min_x = self._max_x = self._min_y = self._max_y = 0
+        # Leave room for one cell on either side, so that neighbour keys never wrap into the next column
+        self._height = self._max_y - self._min_y + 3
+        keys = self._keys(cells_x, cells_y)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys_sorted = keys[self._order]
+
+    def __len__(self):
+        return len(self.xs)
+
+    @staticmethod
+    def _cells(xs: np.ndarray, ys: np.ndarray, cell_size: float) -> tuple[np.ndarray, np.ndarray]:
+        return np.floor(xs / cell_size).astype(np.int64), np.floor(ys / cell_size).astype(np.int64)
+
+    def _keys(self, cells_x, cells_y):
+        return (np.asarray(cells_x) - self._min_x) * self._height + (np.asarray(cells_y) - self._min_y + 1)
+
+    def _gather(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Concatenates the ranges [start, end) of the sorted points and returns their indices"""
+        counts = ends - starts
+        total = int(counts.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        positions = np.arange(total) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return self._order[positions]
+
+    def _candidates(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """Returns the indices of all points in cells touching the rectangle"""
+        (cell_min_x, cell_max_x), (cell_min_y, cell_max_y) = self._cells(
+            np.array([min_x, max_x]), np.array([min_y, max_y]), self.cell_size
+        )
+        cell_min_x, cell_max_x = max(cell_min_x, self._min_x), min(cell_max_x, self._max_x)
+        cell_min_y, cell_max_y = max(cell_min_y, self._min_y), min(cell_max_y, self._max_y)
+        if cell_min_x > cell_max_x or cell_min_y > cell_max_y:
+            return np.empty(0, dtype=np.int64)
+
+        columns = np.arange(cell_min_x, cell_max_x + 1)
+        starts = np.searchsorted(self._keys_sorted, self._keys(columns, cell_min_y), side="left")
+        ends = np.searchsorted(self._keys_sorted, self._keys(columns, cell_max_y), side="right")
+        return self._gather(starts, ends)
+
+    def tiles_in_rect(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        """
+        Returns the sorted indices of all points inside a rectangle, including its edges.
+
+        :param min_x: The left edge of the rectangle
+        :param min_y: The lower edge of the rectangle
+        :param max_x: The right edge of the rectangle
+        :param max_y: The upper edge of the rectangle
+        """
+        if not len(self) or min_x > max_x or min_y > max_y:
+            return np.empty(0, dtype=np.int64)
+        candidates = self._candidates(min_x, min_y, max_x, max_y)
+        xs, ys = self.xs[candidates], self.ys[candidates]
+        inside = (xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)
+        return np.sort(candidates[inside])
+
+    def nearest_tile(self, x: float, y: float) -> int | None:
+        """
+        Returns the index of the point closest to a position, or None if there are no points.
+        Of several points at the same distance, the one with the lowest index is returned.
+
+        :param x: The x position
+        :param y: The y position
+        """
+        if not len(self):
+            return None
+        # Grow a square around the position until it contains a point
+        reach = self.cell_size
+        extent = max(self._max_x - self._min_x, self._max_y - self._min_y) * self.cell_size + abs(x) + abs(y)
+        while not len(candidates := self._candidates(x - reach, y - reach, x + reach, y + reach)):
+            if reach > extent:
+                candidates = np.arange(len(self))
+                break
+            reach *= 2
+
+        # The closest point may lie outside the square, but never further away than the closest one found in it
+        distance = np.sqrt(np.min((self.xs[candidates] - x) ** 2 + (self.ys[candidates] - y) ** 2))
+        candidates = self._candidates(x - distance, y - distance, x + distance, y + distance)
+        distances = (self.xs[candidates] - x) ** 2 + (self.ys[candidates] - y) ** 2
+        closest = candidates[distances == distances.min()]
+        return int(closest.min())
+
+    def overlapping_tiles(self, radius: float) -> np.ndarray:
+        """
+        Returns all pairs of points that are at most radius apart, as an array of shape (pairs, 2)
+        with the lower index first. Consecutive tiles are exactly one unit apart.
+
+        :param radius: The largest distance between two points that counts as overlapping
+        """
+        if radius < 0:
+            raise AttributeError("The radius can not be negative!")
+        if not len(self):
+            return np.empty((0, 2), dtype=np.int64)
+        # Cells at least as large as the radius, so only neighbouring cells need to be compared
+        index = self if radius <= self.cell_size else SpatialIndex(self.xs, self.ys, radius)
+        cells_x, cells_y = index._cells(index.xs, index.ys, index.cell_size)
+        points = np.arange(len(index))
+
+        pairs = []
+        # Half of the neighbourhood, so every pair of cells is compared once
+        for dx, dy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+            keys = index._keys(cells_x + dx, cells_y + dy)
+            starts = np.searchsorted(index._keys_sorted, keys, side="left")
+            ends = np.searchsorted(index._keys_sorted, keys, side="right")
+            first = np.repeat(points, ends - starts)
+            second = index._gather(starts, ends)
+            if dx == dy == 0:
+                keep = first < second
+                first, second = first[keep], second[keep]
+            distances = (index.xs[first] - index.xs[second]) ** 2 + (index.ys[first] - index.ys[second]) ** 2
+            close = distances <= radius ** 2
+            pairs.append(np.stack([np.minimum(first[close], second[close]),
+                                   np.maximum(first[close], second[close])], axis=1))
+
+        pairs = np.concatenate(pairs)
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
@@ -0,0 +1,176 @@
+# Inverted index from event tags to the actions and decorations carrying them
+
+import numpy as np
+
+from .decorations import DecorationStore
+from .tempo import beats_to_ms
+
+# Keys of actions naming the event tags of other actions. The tag of every other action names decorations.
+ACTION_TAG_KEYS = {
+    "RepeatEvents": ("tag",),
+    "SetConditionalEvents": ("perfectTag", "hitTag", "earlyPerfectTag", "latePerfectTag", "barelyTag",
+                             "veryEarlyTag", "veryLateTag", "missTag", "lossTag"),
+}
+DECORATION_TAG_KEY = "tag"
+
+# Conditional events name this tag instead of leaving a tag empty
+NO_TAG = "NONE"
+
+
+def split_tags(value) -> list[str]:
+    """Returns the single tags of a tag value. Several tags are separated by spaces."""
+    if type(value) is not str:
+        return []
+    return [tag for tag in value.split() if tag != NO_TAG]
+
+
+class Tagged:
+    """
+    The actions and decorations found for one or more tags.
+
+    fields:
+        actions: list[dict]: The action dicts, in floor order
+        action_floors: np.ndarray: The floor of every action
+        action_times: np.ndarray: The time every action fires at in milliseconds, including its angle offset
+        decorations: np.ndarray: The rows of the decorations in the DecorationStore of the map
+        decoration_floors: np.ndarray: The floor of every decoration
+        decoration_times: np.ndarray: The time the floor of every decoration is reached at in milliseconds
+    """
+
+    def __init__(self, actions: list[dict], action_floors: np.ndarray, action_times: np.ndarray,
+                 decorations: np.ndarray, decoration_floors: np.ndarray, decoration_times: np.ndarray):
+        self.actions = actions
+        self.action_floors = action_floors
+        self.action_times = action_times
+        self.decorations = decorations
+        self.decoration_floors = decoration_floors
+        self.decoration_times = decoration_times
+
+    def __len__(self):
+        return len(self.actions) + len(self.decorations)
+
+    def __repr__(self):
+        return f"Tagged(actions={len(self.actions)}, decorations={len(self.decorations)})"
+
+
+class TagIndex:
+    """
+    Maps every event tag to the actions carrying it in their eventTag and the decorations carrying it in their tag,
+    so resolving what an action refers to needs no scan over the whole map.
+    Built in one pass over the actions. Decorations are looked up in the tag index of the DecorationStore,
+    so edits of decorations show up right away, while edits of actions need a new index.
+
+    fields:
+        tags: list[str]: All tags carried by actions or decorations
+        references: dict[int, list[dict]]: The actions referring to tags of other actions or decorations,
+                    grouped by floor
+
+    functions:
+        tagged: Returns everything carrying a tag
+        targets: Returns everything an action refers to
+        affected_by: Returns everything the actions on a floor refer to
+
+    :param actions: The action dicts of a map, grouped by floor.
+    :param decorations: The decorations of a map.
+    :param table: TileTable: The tiles of the map, for the times of the floors. Times are NaN without tiles.
+    """
+
+    def __init__(self, actions: dict[int, list[dict]], decorations: DecorationStore = None, table=None):
+        self.decorations = decorations if decorations is not None else DecorationStore()
+        if table is not None:
+            self._floor_times, self._floor_bpm = table.distance_from_start, table.bpm
+        else:
+            self._floor_times, self._floor_bpm = np.empty(0), np.empty(0)
+        self.references: dict[int, list[dict]] = {}
+        self._actions: list[dict] = []
+
+        floors, angle_offsets, tags, action_ids = [], [], [], []
+        references = self.references
+        for floor in sorted(actions):
+            for action in actions[floor]:
+                event_tag = action.get("eventTag")
+                # Most actions have no tag at all, so they are skipped before splitting anything
+                if event_tag and (action_tags := split_tags(event_tag)):
+                    action_ids.extend([len(self._actions)] * len(action_tags))
+                    tags.extend(action_tags)
+                    self._actions.append(action)
+                    floors.append(floor)
+                    angle_offset = action.get("angleOffset")
+                    angle_offsets.append(angle_offset if type(angle_offset) in (int, float) else 0)
+                keys = ACTION_TAG_KEYS.get(action.get("eventType"))
+                if keys is None:
+                    refers = split_tags(action.get(DECORATION_TAG_KEY)) if DECORATION_TAG_KEY in action else False
+                else:
+                    refers = any([split_tags(action.get(key)) for key in keys])
+                if refers:
+                    references.setdefault(floor, []).append(action)
+        self._action_floors = np.asarray(floors, dtype=np.int64)
+        self._action_times = self._times(self._action_floors, np.asarray(angle_offsets, dtype=np.float64))
+
+        names = list(dict.fromkeys(tags))
+        codes = {name: code for code, name in enumerate(names)}
+        tag_codes = np.asarray([codes[tag] for tag in tags], dtype=np.int64)
+        order = np.argsort(tag_codes, kind="stable")
+        starts = np.searchsorted(tag_codes[order], np.arange(len(names) + 1))
+        action_ids = np.asarray(action_ids, dtype=np.int64)[order]
+        self._tagged_actions = {name: action_ids[starts[code]:starts[code + 1]] for code, name in enumerate(names)}
+
+    def _times(self, floors: np.ndarray, angle_offsets: np.ndarray = None) -> np.ndarray:
+        """Returns the times of floors in milliseconds, moved by angle offsets in degrees, where 180 are one beat"""
+        inside = (floors >= 0) & (floors < len(self._floor_times))
+        times = np.full(len(floors), np.nan)
+        times[inside] = self._floor_times[floors[inside]]
+        if angle_offsets is not None:
+            times[inside] += beats_to_ms(angle_offsets[inside] / 180, self._floor_bpm[floors[inside]])
+        return times
+
+    @property
+    def tags(self) -> list[str]:
+        return list(dict.fromkeys([*self._tagged_actions, *self.decorations.single_tags]))
+
+    def _collect(self, action_tags: list[str], decoration_tags: list[str]) -> Tagged:
+        empty = np.empty(0, dtype=np.int64)
+        action_ids = np.unique(np.concatenate([empty] + [self._tagged_actions.get(tag, empty) for tag in action_tags]))
+        rows = np.unique(np.concatenate([empty] + [self.decorations.with_tag(tag) for tag in decoration_tags]))
+        decoration_floors = self.decorations.floors[rows].astype(np.int64)
+        return Tagged([self._actions[i] for i in action_ids.tolist()], self._action_floors[action_ids],
+                      self._action_times[action_ids], rows, decoration_floors, self._times(decoration_floors))
+
+    def tagged(self, tag: str) -> Tagged:
+        """
+        Returns the actions with a tag in their eventTag and the decorations with it in their tag.
+
+        :param tag: A single tag
+        """
+        return self._collect([tag], [tag])
+
+    def targets(self, action: dict) -> Tagged:
+        """
+        Returns what an action refers to by tag: the actions repeated or triggered by RepeatEvents and
+        SetConditionalEvents, or the decorations changed by e.g. MoveDecorations.
+
+        :param action: The action dict
+        """
+        keys = ACTION_TAG_KEYS.get(action.get("eventType"))
+        if keys is not None:
+            return self._collect([tag for key in keys for tag in split_tags(action.get(key))], [])
+        return self._collect([], split_tags(action.get(DECORATION_TAG_KEY)))
+
+    def affected_by(self, floor: int, event_type: str = None) -> Tagged:
+        """
+        Returns everything the actions on a floor refer to by tag.
+
+        :param floor: The floor of the actions
+        :param event_type: Only follow actions of this event type, e.g. "MoveDecorations"
+        """
+        action_tags, decoration_tags = [], []
+        for action in self.references.get(floor, []):
+            kind = action.get("eventType")
+            if event_type is not None and kind != event_type:
+                continue
+            keys = ACTION_TAG_KEYS.get(kind)
+            if keys is not None:
+                action_tags.extend(tag for key in keys for tag in split_tags(action.get(key)))
+            else:
+                decoration_tags.extend(split_tags(action.get(DECORATION_TAG_KEY)))
+        return self._collect(action_tags, decoration_tags)
@@ -0,0 +1,141 @@
+# Tempo map of a map: piecewise constant bpm segments built from SetSpeed actions
+
+import numpy as np
+
+
+def beats_to_ms(beats, bpm):
+    """
+    Converts durations in beats at a constant bpm to milliseconds. A bpm of zero gives zero milliseconds.
+    Works on single numbers as well as on arrays.
+
+    :param beats: The durations in beats
+    :param bpm: The beats per minute the durations are played at
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(np.asarray(bpm) != 0, beats * (60_000 / np.asarray(bpm, dtype=np.float64)), 0.0)
+
+
+def apply_speed_changes(start_bpm: float, speed_changes: dict[int, dict]) -> tuple[list[int], list[float]]:
+    """
+    Applies SetSpeed actions in floor order and returns the floors they are on and the bpm after each of them.
+
+    :param start_bpm: The bpm before the first speed change
+    :param speed_changes: The SetSpeed action dicts by floor, at most one per floor
+    """
+    floors = sorted(speed_changes)
+    values = []
+    cur_bpm = start_bpm
+    for floor in floors:
+        speed_change = speed_changes[floor]
+        speed_type = speed_change.get("speedType")
+        if speed_type == "Bpm":
+            cur_bpm = speed_change.get("beatsPerMinute")
+        elif speed_type == "Multiplier":
+            cur_bpm *= speed_change.get("bpmMultiplier")
+        else:
+            raise AttributeError(f"Unknown speed type: {speed_type}!")
+        values.append(cur_bpm)
+    return floors, values
+
+
+class TempoMap:
+    """
+    The tempo of a map as a list of segments with a constant bpm.
+
+    Converts between beats and milliseconds for whole arrays at once and gives the points where the tempo changes,
+    e.g. for set_tempo events of a midi file. Positions are counted from the start of the map like
+    Tile.distance_from_start, so the first floor takes no time.
+
+    fields:
+        floors: The first floor of every segment
+        beats: The start of every segment in beats
+        ms: The start of every segment in milliseconds
+        bpm: The bpm of every segment
+
+    functions:
+        from_table: Builds the tempo map of a TileTable
+        from_speed_changes: Builds a tempo map from SetSpeed actions and the beat positions of the floors
+        beats_to_ms, ms_to_beats: Converts positions between beats and milliseconds
+        bpm_at: Returns the bpm at positions in beats
+
+    :param floors: The first floor of every segment.
+    :param beats: The start of every segment in beats, in ascending order.
+    :param bpm: The bpm of every segment.
+    """
+
+    def __init__(self, floors, beats, bpm):
+        self.floors = np.asarray(floors, dtype=np.int64)
+        self.beats = np.asarray(beats, dtype=np.float64)
+        self.bpm = np.asarray(bpm, dtype=np.float64)
+        self.ms = np.zeros(len(self.beats))
+        np.cumsum(beats_to_ms(np.diff(self.beats), self.bpm[:-1]), out=self.ms[1:])
+
+    @classmethod
+    def from_table(cls, table) -> "TempoMap":
+        """
+        Builds the tempo map of a TileTable. The segment starts are taken from the table, so converting the
+        position of a floor gives exactly the value of the table.
+
+        :param table: TileTable: The table to build the tempo map of.
+        """
+        bpm = table.bpm
+        floors = np.flatnonzero(np.diff(bpm)) + 1
+        floors = np.concatenate(([0], floors)) if len(bpm) else floors
+        tempo_map = cls.__new__(cls)
+        tempo_map.floors = floors
+        tempo_map.beats = table.distance_from_start_beats[floors]
+        tempo_map.ms = table.distance_from_start[floors]
+        tempo_map.bpm = bpm[floors]
+        return tempo_map
+
+    @classmethod
+    def from_speed_changes(cls, base_bpm: float, speed_changes: dict[int, dict], floor_beats) -> "TempoMap":
+        """
+        Builds a tempo map from the SetSpeed actions of a map.
+
+        :param base_bpm: The bpm of the map
+        :param speed_changes: The SetSpeed action dicts by floor, at most one per floor. The first floor is ignored.
+        :param floor_beats: The position of every floor in beats, e.g. TileTable.distance_from_start_beats
+        """
+        floor_beats = np.asarray(floor_beats, dtype=np.float64)
+        speed_changes = {floor: action for floor, action in speed_changes.items() if 0 < floor < len(floor_beats)}
+        floors, values = apply_speed_changes(float(base_bpm), speed_changes)
+        floors = np.asarray([0] + floors, dtype=np.int64)
+        return cls(floors, floor_beats[floors], [float(base_bpm)] + values)
+
+    def __len__(self):
+        return len(self.beats)
+
+    def __repr__(self):
+        return f"TempoMap({len(self)} segments)"
+
+    def _segments(self, starts: np.ndarray, positions) -> tuple[np.ndarray, np.ndarray]:
+        positions = np.asarray(positions, dtype=np.float64)
+        return positions, np.maximum(np.searchsorted(starts, positions, side="right") - 1, 0)
+
+    def beats_to_ms(self, beats) -> np.ndarray:
+        """
+        Converts positions in beats to milliseconds.
+
+        :param beats: The positions in beats, as a number or an array
+        """
+        beats, segments = self._segments(self.beats, beats)
+        return self.ms[segments] + beats_to_ms(beats - self.beats[segments], self.bpm[segments])
+
+    def ms_to_beats(self, ms) -> np.ndarray:
+        """
+        Converts positions in milliseconds to beats. Positions in a segment with a bpm of zero give its start.
+
+        :param ms: The positions in milliseconds, as a number or an array
+        """
+        ms, segments = self._segments(self.ms, ms)
+        return self.beats[segments] + (ms - self.ms[segments]) * self.bpm[segments] / 60_000
+
+    def bpm_at(self, beats) -> np.ndarray:
+        """
+        Returns the bpm at positions in beats.
+
+        :param beats: The positions in beats, as a number or an array
+        """
+        _, segments = self._segments(self.beats, beats)
+        return self.bpm[segments]
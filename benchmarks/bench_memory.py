@@ -0,0 +1,45 @@
+# Memory usage per floor of the tile, angle and action representations
+#
+# Usage: python -m benchmarks.bench_memory [floors]
+
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from adofai.Map import Map
+from benchmarks.generate import write_map
+
+
+def traced_bytes(func) -> tuple[int, object]:
+    """Returns the memory still allocated after calling func, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def main(floors: int = 100_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_map(os.path.join(directory, "memory.adofai"), floors, event_density=0.5)
+        level = Map(path, lazy=True)
+        # The table is built from the actions, so the body of the map is read first and not counted with it
+        for stage in ("actions", "decorations"):
+            getattr(level, stage)
+        table_bytes, table = traced_bytes(lambda: level.tile_table)
+        action_bytes, tile_actions = traced_bytes(lambda: level.tile_actions)
+        tiles = level.tile_list
+        tile_bytes, _ = traced_bytes(lambda: [tiles[i] for i in range(len(tiles))])
+
+    action_count = sum(len(actions) for actions in tile_actions.values())
+    print(f"floors: {floors}")
+    print(f"tile table: {table_bytes / floors:.1f} bytes per floor ({table_bytes / 2 ** 20:.1f} MiB)")
+    print(f"tile objects: {tile_bytes / floors:.1f} bytes per floor ({tile_bytes / 2 ** 20:.1f} MiB)")
+    print(f"action objects: {action_bytes / max(action_count, 1):.1f} bytes per action ({action_count} actions)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,70 @@
+# Synthetic map generators for the benchmarks
+
+import json
+import random
+
+PATH_LETTERS = "RpJETUoqGQHWLxNZFVDYBCMA56"
+
+
+def generate_map(floors: int, event_density: float = 0.1, decorations: int = 0, seed: int = 0) -> dict:
+    """
+    Generates the data of a random map.
+
+    :param floors: The number of floors of the map
+    :param event_density: The average number of events per floor
+    :param decorations: The number of decorations
+    :param seed: The seed of the random generator
+    """
+    rng = random.Random(seed)
+    path_data = "".join(rng.choice(PATH_LETTERS) if rng.random() > 0.02 else "!" for _ in range(floors))
+
+    actions = []
+    for _ in range(int(floors * event_density)):
+        floor = rng.randrange(1, floors)
+        kind = rng.random()
+        if kind < 0.2:
+            actions.append({"floor": floor, "eventType": "Twirl"})
+        elif kind < 0.3:
+            actions.append({"floor": floor, "eventType": "SetSpeed", "speedType": "Bpm",
+                            "beatsPerMinute": rng.choice((100, 150, 200, 240))})
+        elif kind < 0.4:
+            actions.append({"floor": floor, "eventType": "SetSpeed", "speedType": "Multiplier",
+                            "bpmMultiplier": rng.choice((0.5, 1.5, 2))})
+        elif kind < 0.7:
+            actions.append({"floor": floor, "eventType": "MoveDecorations", "duration": 1, "tag": f"deco{floor % 50}",
+                            "positionOffset": [1, 0], "rotationOffset": 0, "scale": [100, 100], "angleOffset": 0,
+                            "ease": "Linear", "eventTag": ""})
+        else:
+            actions.append({"floor": floor, "eventType": "Flash", "duration": 1, "plane": "Background",
+                            "startColor": "ffffff", "startOpacity": 100, "endColor": "ffffff", "endOpacity": 0,
+                            "angleOffset": 0, "eventTag": ""})
+    actions.sort(key=lambda action: action["floor"])
+
+    decoration_list = [
+        {"floor": rng.randrange(1, floors), "eventType": "AddDecoration", "decorationImage": f"image{i % 20}.png",
+         "position": [rng.uniform(-10, 10), rng.uniform(-10, 10)], "relativeTo": "Tile", "pivotOffset": [0, 0],
+         "rotation": rng.choice((0, 45, 90)), "scale": [100, 100], "depth": rng.randrange(-10, 10),
+         "tag": f"deco{i % 50}"}
+        for i in range(decorations)
+    ]
+
+    return {
+        "pathData": path_data,
+        "settings": {"version": 13, "artist": "Benchmark", "song": "Benchmark", "author": "Benchmark",
+                     "bpm": 120, "offset": 0, "pitch": 100, "hitsoundVolume": 100},
+        "actions": actions,
+        "decorations": decoration_list,
+    }
+
+
+def write_map(path: str, floors: int, event_density: float = 0.1, decorations: int = 0, seed: int = 0) -> str:
+    """
+    Writes a random map to a file, with the trailing commas the adofai editor writes.
+
+    :param path: The path of the map file
+    """
+    text = json.dumps(generate_map(floors, event_density, decorations, seed), indent=1)
+    text = text.replace("\n ]", ",\n ]")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
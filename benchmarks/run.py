@@ -0,0 +1,184 @@
+# Benchmarks for loading, tile computation, serialization, MIDI export and drawing
+#
+# Usage:
+#   python -m benchmarks.run --floors 1000 10000 100000 --output results.json
+#   python -m benchmarks.run --compare old.json new.json
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from adofai.Map import Map
+from adofai.parser import read_map_data
+from benchmarks.generate import write_map
+
+# name -> (setup, run). setup gets the path of the generated map and returns the state run works on.
+STAGES = {}
+
+
+def stage(name: str, setup=lambda path: path):
+    def register(func):
+        STAGES[name] = (setup, func)
+        return func
+    return register
+
+
+def _loaded_map(path: str) -> Map:
+    return Map(path)
+
+
+@stage("parse")
+def bench_parse(path: str):
+    return read_map_data(path)
+
+
+@stage("load")
+def bench_load(path: str):
+    return Map(path)
+
+
+def _map_with_body(path: str) -> Map:
+    """Returns a lazy map with its actions and decorations already read, so only the tiles are left to build"""
+    level = Map(path, lazy=True)
+    for stage_name in ("actions", "decorations"):
+        getattr(level, stage_name)
+    return level
+
+
+@stage("load_tiles", setup=_map_with_body)
+def bench_load_tiles(level: Map):
+    level.load_tiles()
+    return level
+
+
+@stage("tile_objects", setup=_loaded_map)
+def bench_tile_objects(level: Map):
+    return list(level.tile_list)
+
+
+@stage("save", setup=_loaded_map)
+def bench_save(level: Map):
+    return level.dumps()
+
+
+@stage("midi", setup=_loaded_map)
+def bench_midi(level: Map):
+    buffer = io.BytesIO()
+    level.to_midi(buffer)
+    return buffer
+
+
+@stage("drawer_frame", setup=_loaded_map)
+def bench_drawer_frame(level: Map):
+    # Drawer.main draws one frame before handling a queued QUIT event
+    from adofai import Drawer
+    if not Drawer.PYGAME_FLAG:
+        raise ImportError("pygame is not installed")
+    pygame = Drawer.pygame
+    Drawer.init_display()
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+    Drawer.main(level.tile_list)
+
+
+def measure(setup, run, path: str, repeat: int) -> dict:
+    """Runs a stage repeat times for the wall time and once more with tracemalloc for the memory"""
+    times = []
+    for _ in range(repeat):
+        state = setup(path)
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    state = setup(path)
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sys.getallocatedblocks() - blocks
+    del result
+    return {"wall_time": min(times), "wall_times": times, "peak_memory": peak, "allocated_blocks": allocated}
+
+
+def run_benchmarks(floors: list[int], event_density: float, decorations: int, stages: list[str],
+                   repeat: int) -> dict:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for floor_count in floors:
+            path = write_map(os.path.join(directory, f"benchmark_{floor_count}.adofai"), floor_count,
+                             event_density=event_density, decorations=decorations)
+            for name in stages:
+                setup, run = STAGES[name]
+                entry = {"stage": name, "floors": floor_count, "event_density": event_density,
+                         "decorations": decorations}
+                try:
+                    entry.update(measure(setup, run, path, repeat))
+                except ImportError as e:
+                    entry["skipped"] = str(e)
+                results.append(entry)
+                print(format_result(entry), file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def format_result(entry: dict) -> str:
+    prefix = f"{entry['stage']:>14} {entry['floors']:>9} floors"
+    if "skipped" in entry:
+        return f"{prefix}  skipped ({entry['skipped']})"
+    return (f"{prefix}  {entry['wall_time'] * 1000:10.1f} ms  {entry['peak_memory'] / 2 ** 20:9.1f} MiB peak"
+            f"  {entry['allocated_blocks']:>10} blocks")
+
+
+def compare(old_path: str, new_path: str):
+    """Prints the wall time and peak memory of every stage in new relative to old"""
+    with open(old_path) as f:
+        old = {(r["stage"], r["floors"]): r for r in json.load(f)["results"] if "skipped" not in r}
+    with open(new_path) as f:
+        new = [r for r in json.load(f)["results"] if "skipped" not in r]
+    for entry in new:
+        before = old.get((entry["stage"], entry["floors"]))
+        if before is None:
+            continue
+        print(f"{entry['stage']:>14} {entry['floors']:>9} floors"
+              f"  time x{entry['wall_time'] / before['wall_time']:.2f}"
+              f"  memory x{entry['peak_memory'] / max(before['peak_memory'], 1):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the adofai benchmarks")
+    parser.add_argument("--floors", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--event-density", type=float, default=0.1, help="average number of events per floor")
+    parser.add_argument("--decorations", type=int, default=1_000)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="file to write the results to as json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run_benchmarks(args.floors, args.event_density, args.decorations, args.stages, args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()